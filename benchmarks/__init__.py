@@ -0,0 +1 @@
+"""End-to-end benchmarks of the campaign scripts on synthetic data (see run_benchmarks.py)."""
@@ -0,0 +1,258 @@
+"""
+End-to-end campaign benchmarks
+Runs the access-key mailing (run.py), key generation (run.py
+--generate-keys) and the event info mailing (run_eventinfo.py) on
+synthetic data against the in-memory sheet and the local SMTP sink, times
+every stage and writes the results to a JSON file. With --baseline the
+run is compared against an earlier results file.
+"""
+
+import os
+
+# Keep the benchmark away from real servers and progress bars, whatever .env says
+os.environ.update({
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_ACCOUNT": "benchmark@rigibeats.ch",
+    "SMTP_PASSWORD": "benchmark",
+    "SMTP_RATE_PER_MINUTE": "100000000",
+    "SMTP_RATE_PER_DAY": "100000000",
+    "TQDM_DISABLE": "1",
+})
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import run
+import run_eventinfo
+from campaign import settings
+from campaign.engine import BACKEND_THREADS, BACKENDS, DEFAULT_WORKERS
+from campaign.fake_sheet import FakeWorksheet
+from campaign.pipeline import MODE_PRODUCTION, Campaign, run_campaign
+from campaign.sheet_scheduler import ScheduledWorksheet, SheetQuota
+from campaign.smtp_pool import close_all_pools
+from campaign.smtp_sink import SMTPSink, SinkStats, parse_latency
+from campaign.sources import CsvSource, StreamingCsvSource
+
+from benchmarks.stages import StageTimer
+from benchmarks.synthetic import sheet_grid, write_orders_csv
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SCENARIOS = ("generate-keys", "access-keys", "eventinfo", "eventinfo-stream")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Quota of the scheduler in front of the fake sheet: the benchmark measures our code, not Google's limits
+UNLIMITED = 10 ** 9
+# A stage has regressed when it is this much slower than in the baseline (and slower by at least MIN_SLOWDOWN_SECONDS)
+DEFAULT_MAX_SLOWDOWN = 1.25
+MIN_SLOWDOWN_SECONDS = 0.05
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fake_sheet(grid, latency):
+    sheet = FakeWorksheet(grid, latency=latency)
+    return ScheduledWorksheet(sheet, quota=SheetQuota(UNLIMITED, UNLIMITED))
+
+
+def campaign_paths(workdir, name):
+    """Delivery index, suppression list and journal of a scenario, all inside its working directory."""
+    return dict(
+        index_path=os.path.join(workdir, "deliveries.sqlite3"),
+        suppression_path=os.path.join(workdir, "suppressions.sqlite3"),
+        journal_path=os.path.join(workdir, f"{name}_journal.jsonl"),
+    )
+
+
+def prepare(scenario, rows, args):
+    """Build the inputs of a scenario; returns a callable running it."""
+    if scenario == "generate-keys":
+        sheet = fake_sheet(sheet_grid(rows, seed=args.seed), args.sheet_latency)
+        return lambda: run.generate_keys_only(sheet, use_cache=False), sheet
+
+    if scenario == "access-keys":
+        sheet = fake_sheet(sheet_grid(rows, seed=args.seed, with_keys=True), args.sheet_latency)
+        campaign = run.access_key_campaign(sheet, use_cache=False)
+        paths = campaign_paths(os.getcwd(), campaign.name)
+        campaign.index_path = paths["index_path"]
+        campaign.suppression_path = paths["suppression_path"]
+        return lambda: run_campaign(campaign, MODE_PRODUCTION, workers=args.workers, backend=args.backend), sheet
+
+    csv_path = write_orders_csv(os.path.abspath(f"orders_{rows}.csv"), rows, seed=args.seed)
+    source_class = StreamingCsvSource if scenario == "eventinfo-stream" else CsvSource
+    campaign = Campaign(
+        name="eventinfo",
+        source=source_class(csv_path, run_eventinfo.SENT_COLUMN),
+        template=run_eventinfo.EVENT_INFO_TEMPLATE,
+        fields=run_eventinfo.event_info_fields,
+        **campaign_paths(os.getcwd(), "eventinfo"),
+    )
+    return lambda: run_campaign(campaign, MODE_PRODUCTION, workers=args.workers, backend=args.backend), None
+
+
+def run_scenario(scenario, rows, args, sink):
+    """Run one scenario in a fresh working directory and return its result entry."""
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="campaign-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            job, sheet = prepare(scenario, rows, args)
+            setup_seconds = time.perf_counter() - started
+            sink.stats = SinkStats()
+            timer = StageTimer()
+            with timer.measure():
+                job()
+            close_all_pools()
+        finally:
+            os.chdir(previous_dir)
+
+    stages = timer.result()
+    smtp = sink.stats.snapshot()
+    result = {
+        "scenario": scenario,
+        "rows": rows,
+        "messages": smtp["messages"],
+        "seconds": stages.pop("total"),
+        "stages": stages,
+        "stage_calls": timer.calls,
+        "messages_per_second": round(smtp["messages"] / stages["deliver"], 1) if smtp["messages"] and stages["deliver"] else None,
+        "setup_seconds": round(setup_seconds, 3),
+        "smtp": smtp,
+    }
+    if sheet is not None:
+        result["sheet_requests"] = dict(sheet.worksheet.requests)
+    return result
+
+
+def compare(report, baseline, max_slowdown):
+    """Log total and per-stage changes against baseline; returns the regressions found."""
+    previous = {(entry["scenario"], entry["rows"]): entry for entry in baseline["results"]}
+    regressions = []
+    logging.info(f"\nCompared with {baseline.get('commit') or 'baseline'} from {baseline.get('created', '?')}:")
+    if baseline.get("options") != report["options"]:
+        logging.warning(f"Options differ from the baseline ({baseline.get('options')}), the numbers are not comparable")
+    results = report["results"]
+    for entry in results:
+        before = previous.get((entry["scenario"], entry["rows"]))
+        if before is None:
+            continue
+        pairs = [("total", before["seconds"], entry["seconds"])]
+        pairs += [(stage, before["stages"].get(stage, 0.0), seconds) for stage, seconds in entry["stages"].items()]
+        for stage, old, new in pairs:
+            ratio = new / old if old else None
+            slower = ratio is not None and ratio > max_slowdown and new - old >= MIN_SLOWDOWN_SECONDS
+            if stage == "total" or slower:
+                marker = "❗" if slower else "  "
+                change = f"{ratio:.2f}x" if ratio is not None else "new"
+                logging.info(f"{marker} {entry['scenario']:<17} {entry['rows']:>7} {stage:<8} {old:9.3f}s -> {new:9.3f}s ({change})")
+            if slower:
+                regressions.append((entry["scenario"], entry["rows"], stage, old, new))
+    return regressions
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark campaign runs end to end on synthetic data',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # All scenarios at 1k, 10k and 100k rows:
+  uv run python -m benchmarks.run_benchmarks
+
+  # Quick run of the event info mailing over the asyncio backend:
+  uv run python -m benchmarks.run_benchmarks --sizes 1000 --scenarios eventinfo --backend asyncio
+
+  # With API-like latencies, compared with an earlier run (exit code 1 on a regression):
+  uv run python -m benchmarks.run_benchmarks --sheet-latency 0.2 --smtp-latency DATA=0.05 \\
+      --baseline benchmarks/results/previous.json
+        """
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Rows per input')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_THREADS)
+    parser.add_argument('--sheet-latency', type=float, default=0.0, help='Seconds per sheet API call')
+    parser.add_argument(
+        '--smtp-latency', action='append', metavar='[COMMAND=]SECONDS',
+        help='Reply delay of the SMTP sink (see smtp_sink.py --latency); repeatable'
+    )
+    parser.add_argument('--no-starttls', action='store_true', help='Plain SMTP to the sink')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>_<commit>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to compare with')
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help='Slowdown factor counted as a regression')
+    parser.add_argument('--verbose', action='store_true', help='Keep the per-message log output')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    sink = SMTPSink(port=0, starttls=not args.no_starttls, latency=parse_latency(args.smtp_latency))
+    sink.start_background()
+    settings.SMTP_PORT = sink.port
+    settings.SMTP_STARTTLS = not args.no_starttls
+    settings.SMTP_CA_FILE = os.path.abspath(sink.cert) if sink.cert else None
+
+    commit = git_commit()
+    results = []
+    try:
+        for rows in args.sizes:
+            for scenario in args.scenarios:
+                result = run_scenario(scenario, rows, args, sink)
+                results.append(result)
+                stages = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in result["stages"].items())
+                print(f"⏱️  {scenario:<17} {rows:>7} rows {result['seconds']:8.2f}s  "
+                      f"{result['messages']:>6} msgs  {stages}", flush=True)
+    finally:
+        sink.stop()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {
+            "backend": args.backend,
+            "workers": args.workers,
+            "starttls": not args.no_starttls,
+            "sheet_latency": args.sheet_latency,
+            "smtp_latency": sink.latency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y-%m-%d_%H%M')}_{commit or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    if args.baseline:
+        logging.getLogger().setLevel(logging.INFO)
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_slowdown)
+        if regressions:
+            logging.error(f"{len(regressions)} stage(s) slower than {args.max_slowdown}x the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
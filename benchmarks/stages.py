@@ -0,0 +1,109 @@
+"""
+Per-stage timing of a campaign run.
+StageTimer wraps the functions that make up each pipeline stage and books
+the time spent in them to that stage. Stages nest (record() flushing the
+sheet buffer, render() inside deliver()), so every stage gets its own
+time only, like a profiler's self time: load + plan + render + deliver +
+record + other adds up to the wall time of the run.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import run
+from campaign import pipeline
+from campaign.delivery_index import DeliveryIndex
+from campaign.journal import SendJournal
+from campaign.pipeline import Campaign
+from campaign.sheet_buffer import SheetWriteBuffer
+from campaign.sources import CsvSource, SheetSource, StreamingCsvSource
+
+STAGES = ("load", "plan", "render", "deliver", "record")
+
+# (owner, attribute, stage) of every function that is timed
+STAGE_FUNCTIONS = [
+    (CsvSource, "load", "load"),
+    (StreamingCsvSource, "load", "load"),
+    (SheetSource, "load", "load"),
+    (run, "load_sheet_values", "load"),
+    (CsvSource, "select", "plan"),
+    (StreamingCsvSource, "select", "plan"),
+    (SheetSource, "select", "plan"),
+    (pipeline, "skip_suppressed", "plan"),
+    (pipeline, "skip_received", "plan"),
+    # Key generation has no separate planning step: everything it does
+    # besides loading and writing counts as planning
+    (run, "generate_keys_only", "plan"),
+    (Campaign, "render", "render"),
+    (pipeline, "deliver", "deliver"),
+    (CsvSource, "record", "record"),
+    (SheetSource, "record", "record"),
+    (StreamingCsvSource, "record", "record"),
+    (SheetWriteBuffer, "flush", "record"),
+    (SendJournal, "record", "record"),
+    (DeliveryIndex, "record", "record"),
+]
+
+
+class StageTimer:
+    """Self time per stage of the calling thread, plus call counts."""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self._local = threading.local()
+        self._started = None
+        self.total = 0.0
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def wrap(self, stage, function):
+        timer = self
+
+        def timed(*args, **kwargs):
+            stack = timer._stack()
+            now = time.perf_counter()
+            if stack:
+                # Pause the enclosing stage
+                outer, since = stack[-1]
+                timer.seconds[outer] += now - since
+            stack.append([stage, now])
+            timer.calls[stage] += 1
+            try:
+                return function(*args, **kwargs)
+            finally:
+                now = time.perf_counter()
+                timer.seconds[stage] += now - stack.pop()[1]
+                if stack:
+                    stack[-1][1] = now
+
+        timed.__wrapped__ = function
+        return timed
+
+    @contextmanager
+    def measure(self):
+        """Time the stages of everything run inside the with-block (main thread only)."""
+        originals = []
+        for owner, attribute, stage in STAGE_FUNCTIONS:
+            function = owner.__dict__[attribute]
+            originals.append((owner, attribute, function))
+            setattr(owner, attribute, self.wrap(stage, function))
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total = time.perf_counter() - started
+            for owner, attribute, function in originals:
+                setattr(owner, attribute, function)
+
+    def result(self):
+        """{stage: seconds} including 'other' (time outside the timed functions) and 'total'."""
+        stages = {stage: round(seconds, 4) for stage, seconds in self.seconds.items()}
+        stages["other"] = round(max(0.0, self.total - sum(self.seconds.values())), 4)
+        stages["total"] = round(self.total, 4)
+        return stages
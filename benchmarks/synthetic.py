@@ -0,0 +1,172 @@
+"""
+Synthetic inputs for the benchmarks.
+Orders CSVs shaped like the Eventfrog export (same columns, buyers with
+several tickets, box-office rows without email, the Goldau/Gersau category
+mix of the 2026 export) and access-key sheets shaped like the Google Sheet
+run.py works on. Generation is seeded, so a given size always yields the
+same data.
+"""
+
+import csv
+import random
+
+from campaign.access_keys import ALPHABET, KEY_LENGTH, format_access_key
+
+ORDERS_COLUMNS = [
+    "ID", "Ticket ID", "Seat", "Status", "Category", "Access key", "Order number", "Payment method",
+    "Paid", "Date of purchase", "Time of purchase", "Price", "Currency", "Firma", "First name",
+    "Last name", "Email", "Postcode", "City", "Street / Nr.", "Discount", "Final price",
+    "Promo codes for this order", "In/Out", "Date", "Time", "All check-ins/check-outs",
+]
+
+# Category -> (share of tickets, price) as in the 2026 Orders export (69% Goldau)
+CATEGORY_MIX = {
+    "Party Ticket via Goldau (ohne GA / Saisonabo) 👑🏔️": (183, 70),
+    "Party Ticket via Goldau (mit GA / Saisonabo) 👑🏔️": (80, 45),
+    "Party Ticket via Gersau (ohne Saisonabo) 👑🏔️": (60, 60),
+    "Party Ticket via Gersau (ohne Saisonabo) 👑🏔️🆓": (56, 0),
+    "Party Ticket via Goldau (ohne GA / Saisonabo) 👑🏔️🆓": (13, 0),
+    "Party Ticket via Goldau (ohne GA / Saisonabo) 👑🏔️🤗": (12, 70),
+    "Party Ticket via Gersau (ohne Saisonabo) 👑🏔️🤗": (11, 60),
+    "Party Ticket via Gersau (mit Saisonabo) 👑🏔️🆓": (6, 0),
+    "Party Ticket via Goldau (mit GA / Saisonabo) 👑🏔️🆓": (5, 0),
+    "Party Ticket via Gersau (mit Saisonabo) 👑🏔️": (2, 45),
+    "Party Ticket via Goldau (mit GA / Saisonabo) 👑🏔️🤗": (1, 45),
+}
+PAYMENT_METHODS = {"Twint": 253, "Apple Pay": 61, "Mastercard": 21, "Visa": 16}
+
+# The 2026 export has 2.7 ticket rows per address and 4% box-office rows without email
+BOX_OFFICE_SHARE = 0.04
+# Share of a buyer's further rows whose address is spelled differently (case, spaces, googlemail)
+VARIANT_SPELLING_SHARE = 0.05
+# Tickets per order and how often they occur
+TICKETS_PER_ORDER = {1: 30, 2: 25, 3: 15, 4: 12, 5: 8, 6: 10}
+
+FIRST_NAMES = ["Lea", "Noah", "Mia", "Luca", "Elena", "Jonas", "Anna", "Nico", "Sara", "Levin", "Laura", "Jan"]
+LAST_NAMES = ["Müller", "Meier", "Schmid", "Keller", "Weber", "Huber", "Steiner", "Fischer", "Baumann", "Frei"]
+DOMAINS = ["gmail.com", "bluewin.ch", "hotmail.com", "gmx.ch", "icloud.com", "outlook.com", "sunrise.ch"]
+CITIES = [("6410", "Goldau"), ("6442", "Gersau"), ("6003", "Luzern"), ("8001", "Zürich"), ("6300", "Zug")]
+
+# Access-key sheet (see run.py)
+SHEET_COLUMNS = ["Name", "Email", "Status", "Selbstkauf", "Grund", "# Tickets", "Ticketkat.", "Access Key"]
+SHEET_STATUS_OPEN_SHARE = 0.75
+SHEET_SELF_BOUGHT_SHARE = 0.08
+SHEET_PHONE_SHARE = 0.03
+SHEET_REPEATED_ADDRESS_SHARE = 0.10
+GRUENDE = ["Helfer", "Sponsor", "Artist", "Presse", "Gewinnspiel"]
+TICKET_CATEGORIES = ["VIP", "Backstage", "Standard"]
+
+
+def _weighted(rng, table):
+    return rng.choices(list(table), weights=[v[0] if isinstance(v, tuple) else v for v in table.values()])[0]
+
+
+def _person(rng, number):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    local = f"{first}.{last}{number}".lower().replace("ü", "ue")
+    email = f"{local}@{rng.choice(DOMAINS)}"
+    return first, last, email
+
+
+def _code(rng, length=KEY_LENGTH):
+    return "".join(rng.choices(ALPHABET, k=length))
+
+
+def _variant_spelling(rng, email):
+    local, _, domain = email.partition("@")
+    choice = rng.randrange(3)
+    if choice == 0:
+        return email.upper()
+    if choice == 1:
+        return f" {email} "
+    if domain == "gmail.com":
+        return f"{local}@googlemail.com"
+    return email.capitalize()
+
+
+def orders_rows(count, seed=0):
+    """count ticket rows of a synthetic Orders export (lists in ORDERS_COLUMNS order)."""
+    rng = random.Random(seed)
+    rows = []
+    order_number = 100000
+    buyer = 0
+    while len(rows) < count:
+        order_number += 1
+        tickets = min(_weighted(rng, TICKETS_PER_ORDER), count - len(rows))
+        box_office = rng.random() < BOX_OFFICE_SHARE
+        buyer += 1
+        first, last, email = _person(rng, buyer)
+        postcode, city = rng.choice(CITIES)
+        payment = _weighted(rng, PAYMENT_METHODS)
+        purchased = f"{rng.randint(1, 28):02d}.{rng.choice([11, 12, 1]):02d}.202{5 if rng.random() < 0.7 else 6}"
+        for ticket in range(tickets):
+            category = _weighted(rng, CATEGORY_MIX)
+            price = CATEGORY_MIX[category][1]
+            row = dict.fromkeys(ORDERS_COLUMNS, "")
+            row.update({
+                "ID": len(rows) + 1,
+                "Ticket ID": _code(rng),
+                "Category": category,
+                "Paid": "yes",
+                "Date of purchase": purchased,
+                "Time of purchase": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+                "Price": price,
+                "Final price": price,
+                "Currency": "CHF",
+                "Discount": 0,
+            })
+            if box_office:
+                row["Status"] = "Sold via box office"
+            else:
+                spelled = email
+                if ticket and rng.random() < VARIANT_SPELLING_SHARE:
+                    spelled = _variant_spelling(rng, email)
+                row.update({
+                    "Status": "sold",
+                    "Order number": order_number,
+                    "Payment method": payment if price else "No payment",
+                    "First name": first,
+                    "Last name": last,
+                    "Email": spelled,
+                    "Postcode": postcode,
+                    "City": city,
+                    "Street / Nr.": f"Dorfstrasse {rng.randint(1, 120)}",
+                })
+            rows.append([row[column] for column in ORDERS_COLUMNS])
+    return rows
+
+
+def write_orders_csv(path, count, seed=0):
+    """Write a synthetic Orders export with count rows to path (UTF-8 with BOM, like Eventfrog)."""
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(ORDERS_COLUMNS)
+        writer.writerows(orders_rows(count, seed))
+    return path
+
+
+def sheet_grid(count, seed=0, with_keys=False):
+    """Header plus count rows of a synthetic access-key sheet; with_keys fills keys for open rows."""
+    rng = random.Random(seed)
+    grid = [list(SHEET_COLUMNS)]
+    emails = []
+    for number in range(1, count + 1):
+        first, last, email = _person(rng, number)
+        if emails and rng.random() < SHEET_REPEATED_ADDRESS_SHARE:
+            email = rng.choice(emails)
+        elif rng.random() < SHEET_PHONE_SHARE:
+            email = f"079 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}"
+        else:
+            emails.append(email)
+        status = "1. Offen" if rng.random() < SHEET_STATUS_OPEN_SHARE else "2. Verschickt"
+        grid.append([
+            f"{first} {last}",
+            email,
+            status,
+            "Nein" if rng.random() < SHEET_SELF_BOUGHT_SHARE else "",
+            rng.choice(GRUENDE),
+            str(rng.randint(1, 4)),
+            rng.choice(TICKET_CATEGORIES),
+            format_access_key(_code(rng)) if with_keys and status == "1. Offen" else "",
+        ])
+    return grid
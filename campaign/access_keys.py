@@ -0,0 +1,92 @@
+"""
+Access key generation for Rigibeats tickets.
+Keys look like RB26-XXXX-XXXX-XXXX. All keys already in use (Google Sheet,
+Eventfrog Orders exports) are loaded into a set, and new keys are drawn in
+bulk from one secrets.token_bytes() call, so every generated key is unique.
+"""
+
+import csv
+import glob
+import logging
+import os
+import secrets
+import string
+
+ALPHABET = string.ascii_uppercase + string.digits
+KEY_PREFIX = "RB26"
+KEY_LENGTH = 12
+ORDERS_ACCESS_KEY_COLUMN = "Access key"
+DEFAULT_ORDERS_GLOB = os.path.join("data", "*Orders*.csv")
+
+# Map random bytes onto the alphabet without modulo bias: bytes >= 252 (7 * 36) are dropped
+_ACCEPTED = 256 - 256 % len(ALPHABET)
+_TRANSLATION = bytes(ord(ALPHABET[b % len(ALPHABET)]) if b < _ACCEPTED else 0 for b in range(256))
+_REJECTED = bytes(range(_ACCEPTED, 256))
+
+
+def format_access_key(chars, prefix=KEY_PREFIX):
+    """Format 12 key characters as PREFIX-XXXX-XXXX-XXXX."""
+    return f"{prefix}-{chars[:4]}-{chars[4:8]}-{chars[8:12]}"
+
+
+def normalize_access_key(key):
+    """Canonical form used for uniqueness checks."""
+    return str(key).strip().upper()
+
+
+class AccessKeyGenerator:
+    """Generates access keys that never collide with keys already issued."""
+
+    def __init__(self, existing_keys=(), prefix=KEY_PREFIX, length=KEY_LENGTH):
+        self.prefix = prefix
+        self.length = length
+        self.issued = set()
+        self.add_existing(existing_keys)
+
+    def __len__(self):
+        return len(self.issued)
+
+    def __contains__(self, key):
+        return normalize_access_key(key) in self.issued
+
+    def add_existing(self, keys):
+        """Register keys that are already in use."""
+        self.issued.update(normalize_access_key(key) for key in keys if key and str(key).strip())
+
+    def load_orders_exports(self, pattern=DEFAULT_ORDERS_GLOB, column=ORDERS_ACCESS_KEY_COLUMN):
+        """Register the access keys found in Eventfrog Orders CSV exports."""
+        before = len(self.issued)
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, newline="", encoding="utf-8-sig") as f:
+                    reader = csv.DictReader(f)
+                    if column not in (reader.fieldnames or []):
+                        continue
+                    self.add_existing(row[column] for row in reader)
+            except (OSError, csv.Error) as e:
+                logging.warning(f"Could not read access keys from {path}: {e}")
+        logging.info(f"Loaded {len(self.issued) - before} existing access keys from Orders exports")
+
+    def _random_chars(self, count):
+        """Return at least count unbiased random alphabet characters."""
+        chars = b""
+        while len(chars) < count:
+            # ~1.6% of bytes are rejected; over-draw a little to usually need a single call
+            needed = count - len(chars)
+            raw = secrets.token_bytes(needed + needed // 32 + 16)
+            chars += raw.translate(_TRANSLATION, _REJECTED)
+        return chars.decode("ascii")
+
+    def generate(self, count):
+        """Generate count new keys, unique among themselves and all registered keys."""
+        keys = []
+        while len(keys) < count:
+            missing = count - len(keys)
+            chars = self._random_chars(missing * self.length)
+            for offset in range(0, missing * self.length, self.length):
+                key = format_access_key(chars[offset:offset + self.length], self.prefix)
+                if key in self.issued:
+                    continue
+                self.issued.add(key)
+                keys.append(key)
+        return keys
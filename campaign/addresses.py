@@ -0,0 +1,43 @@
+"""
+Email address normalisation for deduplication.
+Addresses are trimmed and lower-cased; with canonical=True, known
+providers' aliases are folded onto the mailbox they deliver to (Gmail
+ignores dots and +tags in the local part, several providers ignore
++tags), so "Foo.Bar+rigi@googlemail.com " and "foobar@gmail.com" are
+one recipient.
+"""
+
+import os
+
+# Fold provider aliases unless EMAIL_CANONICAL=0
+CANONICAL = os.getenv("EMAIL_CANONICAL", "1") != "0"
+
+DOMAIN_ALIASES = {"googlemail.com": "gmail.com"}
+# Domains whose local part ignores dots
+DOTLESS_DOMAINS = {"gmail.com"}
+# Domains that deliver local+tag to local
+PLUS_TAG_DOMAINS = {
+    "gmail.com", "outlook.com", "hotmail.com", "live.com", "icloud.com", "me.com",
+    "protonmail.com", "proton.me", "fastmail.com",
+}
+
+
+def normalize_email(email, canonical=CANONICAL):
+    """Dedup key of an address: trimmed, lower-cased and, with canonical, provider aliases folded."""
+    address = str(email).strip().lower()
+    if not canonical or "@" not in address:
+        return address
+    local, _, domain = address.rpartition("@")
+    domain = DOMAIN_ALIASES.get(domain, domain)
+    if domain in PLUS_TAG_DOMAINS:
+        local = local.split("+", 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local = local.replace(".", "")
+    return f"{local}@{domain}"
+
+
+def normalized_emails(emails, canonical=CANONICAL):
+    """normalize_email() for a whole column (NaN stays NaN); each distinct value is normalised once."""
+    unique = emails.dropna().unique()
+    keys = {email: normalize_email(email, canonical) for email in unique}
+    return emails.map(keys)
@@ -0,0 +1,134 @@
+"""
+Shared inline images and attachments for the Rigibeats mail scripts.
+Each file is read and base64-encoded into a complete MIME part once; every
+message of a campaign reuses the same bytes. Parts are keyed by path and
+mtime, so editing an asset mid-session is picked up on the next message.
+Personalised attachments (one set of files per recipient) are never cached:
+they are encoded chunk by chunk while the message is being sent.
+"""
+
+import base64
+import mimetypes
+import os
+import threading
+from email.utils import encode_rfc2231
+
+CRLF = b"\r\n"
+# Read size when streaming; a multiple of 57 bytes, so every chunk encodes to whole 76-char lines
+STREAM_CHUNK_SIZE = 57 * 1024
+
+
+def _filename_param(filename):
+    """filename="..." parameter, RFC 2231 encoded when it is not plain ASCII."""
+    if filename.isascii() and '"' not in filename:
+        return f'filename="{filename}"'
+    return f"filename*={encode_rfc2231(filename, 'utf-8')}"
+
+
+class Asset:
+    """A file that goes into messages as a base64 MIME part."""
+
+    disposition = "attachment"
+
+    def __init__(self, path, content_type=None, filename=None):
+        self.path = os.path.abspath(path)
+        self.filename = filename or os.path.basename(path)
+        self.content_type = (
+            content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        )
+        self.headers = "".join(
+            f"{name}: {value}\r\n" for name, value in self._header_items()
+        ).encode("utf-8")
+
+    def _header_items(self):
+        return [
+            ("Content-Type", self.content_type),
+            ("Content-Transfer-Encoding", "base64"),
+            ("Content-Disposition", f"{self.disposition}; {_filename_param(self.filename)}"),
+        ]
+
+    @property
+    def key(self):
+        return (self.path, self.headers)
+
+    def encode(self, data):
+        """Complete MIME part (headers, blank line, base64 body) for the file contents."""
+        body = base64.encodebytes(data).replace(b"\n", CRLF)
+        return self.headers + CRLF + body
+
+    def stream(self, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield the same MIME part in pieces, holding at most one chunk of the file in memory."""
+        yield self.headers + CRLF
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    break
+                yield base64.encodebytes(block).replace(b"\n", CRLF)
+
+
+class Attachment(Asset):
+    """A regular file attachment."""
+
+
+class InlineImage(Asset):
+    """An image referenced from the HTML body as <img src="cid:...">."""
+
+    disposition = "inline"
+
+    def __init__(self, path, cid=None, content_type=None, filename=None):
+        self.cid = cid or os.path.basename(path)
+        super().__init__(path, content_type=content_type, filename=filename)
+
+    def _header_items(self):
+        return super()._header_items() + [("Content-ID", f"<{self.cid}>")]
+
+    @property
+    def src(self):
+        """Value for the src attribute of the referencing <img> tag."""
+        return f"cid:{self.cid}"
+
+
+def personal_attachments(directory, email):
+    """Attachments for one recipient: every file in directory/<email>/ (lower-cased address)."""
+    folder = os.path.join(directory, str(email).strip().lower())
+    if not os.path.isdir(folder):
+        return []
+    return [
+        Attachment(os.path.join(folder, name))
+        for name in sorted(os.listdir(folder))
+        if not name.startswith(".") and os.path.isfile(os.path.join(folder, name))
+    ]
+
+
+class AssetCache:
+    """Encoded MIME parts keyed by (asset, mtime, size), shared across messages and threads."""
+
+    def __init__(self):
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    def part(self, asset):
+        """Return the encoded part for asset, re-reading the file only when it changed."""
+        stat = os.stat(asset.path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._parts.get(asset.key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(asset.path, "rb") as f:
+            part = asset.encode(f.read())
+        with self._lock:
+            self._parts[asset.key] = (version, part)
+        return part
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+
+
+_cache = AssetCache()
+
+
+def get_asset_cache():
+    """Return the process-wide asset cache."""
+    return _cache
@@ -0,0 +1,284 @@
+"""
+asyncio delivery backend built on aiosmtplib.
+Runs many SMTP conversations from a single event loop and yields the same
+DeliveryResult objects as the threaded DeliveryEngine, so callers do not
+care which backend ran.
+
+Requires the optional 'aiosmtplib' package (uv sync --extra async).
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from campaign.engine import DEFAULT_WORKERS, DeliveryResult
+from campaign.metrics import DELIVERY_QUEUE_DEPTH, SMTP_RATE_LIMIT_WAIT_SECONDS, SMTP_RETRIES, SMTP_SECONDS
+from campaign.rate_limit import MAX_SEND_ATTEMPTS, DailyQuotaExceeded, is_throttle_error
+from campaign.smtp_pool import DEFAULT_MAX_MESSAGES_PER_SESSION, DEFAULT_TIMEOUT, dot_stuffed
+from campaign.templates import OutgoingMessage
+
+try:
+    import aiosmtplib
+    from aiosmtplib.protocol import SMTPProtocol
+except ImportError:
+    aiosmtplib = None
+    SMTPProtocol = None
+
+# Streaming DATA relies on aiosmtplib internals (tested with 5.x); other
+# versions send streamed messages in one piece instead
+STREAMING_SUPPORTED = SMTPProtocol is not None and all(
+    hasattr(SMTPProtocol, name) for name in ("write", "_drain_helper", "read_response")
+)
+
+
+class AsyncDeliveryEngine:
+    """Send DeliveryJobs over N concurrent aiosmtplib sessions on one event loop."""
+
+    def __init__(self, server, port, username, password, concurrency=DEFAULT_WORKERS,
+                 max_messages_per_session=DEFAULT_MAX_MESSAGES_PER_SESSION, timeout=DEFAULT_TIMEOUT,
+                 limiter=None, starttls=True, ca_file=None):
+        if aiosmtplib is None:
+            raise RuntimeError("The asyncio backend needs aiosmtplib. Install it with: uv sync --extra async")
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.concurrency = max(1, concurrency)
+        self.max_messages_per_session = max_messages_per_session
+        self.timeout = timeout
+        self.limiter = limiter
+        self.starttls = starttls
+        self.ca_file = ca_file
+        self.pending_results = []
+        # Set when the daily budget ran out; the jobs not sent by then get no result
+        self.quota_exceeded = False
+
+    async def _connect(self):
+        # Connect, STARTTLS and login step by step (rather than all in connect()) to time each phase
+        smtp = aiosmtplib.SMTP(
+            hostname=self.server, port=self.port, timeout=self.timeout,
+            start_tls=False, cert_bundle=self.ca_file
+        )
+        with SMTP_SECONDS.labels("connect").time():
+            await smtp.connect()
+        try:
+            if self.starttls:
+                with SMTP_SECONDS.labels("starttls").time():
+                    await smtp.starttls()
+            with SMTP_SECONDS.labels("auth").time():
+                await smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    async def _close(self, smtp):
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _send_streamed(self, smtp, message):
+        """Like sendmail, but writes the DATA payload chunk by chunk with flow control."""
+        await smtp.mail(message.sender)
+        refused = []
+        for recipient in message.recipients:
+            try:
+                await smtp.rcpt(recipient)
+            except aiosmtplib.SMTPRecipientRefused as e:
+                refused.append(e)
+        if len(refused) == len(message.recipients):
+            await smtp.rset()
+            raise aiosmtplib.SMTPRecipientsRefused(refused)
+        response = await smtp.execute_command(b"DATA")
+        if response.code != 354:
+            await smtp.rset()
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+        protocol = smtp.protocol
+        for chunk in dot_stuffed(message.chunks()):
+            protocol.write(chunk)
+            # aiosmtplib has no public streaming API; wait for the transport buffer to drain
+            await protocol._drain_helper()
+        response = await protocol.read_response(timeout=self.timeout)
+        if response.code != 250:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+        return {e.recipient: e for e in refused}
+
+    async def _deliver(self, smtp, message):
+        """Send message; a refused To recipient raises even when the BCC copy was accepted."""
+        if isinstance(message, OutgoingMessage):
+            if message.streamed and STREAMING_SUPPORTED:
+                refused = await self._send_streamed(smtp, message)
+            else:
+                errors, _ = await smtp.sendmail(message.sender, message.recipients, message.as_bytes())
+                refused = {
+                    recipient: aiosmtplib.SMTPRecipientRefused(response.code, response.message, recipient)
+                    for recipient, response in errors.items()
+                }
+            to_email = message.recipients[0]
+            if to_email in refused:
+                raise aiosmtplib.SMTPRecipientsRefused([refused[to_email]])
+            return refused
+        return await smtp.send_message(message)
+
+    async def _send(self, smtp, sent_count, message):
+        """Send over smtp (reconnecting/recycling as needed); returns the session in use."""
+        if smtp is None or not smtp.is_connected or sent_count >= self.max_messages_per_session:
+            await self._close(smtp)
+            smtp = await self._connect()
+            sent_count = 0
+        try:
+            with SMTP_SECONDS.labels("data").time():
+                await self._deliver(smtp, message)
+        except aiosmtplib.SMTPServerDisconnected:
+            logging.info("SMTP server disconnected, reconnecting...")
+            SMTP_RETRIES.labels("disconnect").inc()
+            smtp = await self._connect()
+            sent_count = 0
+            with SMTP_SECONDS.labels("data").time():
+                await self._deliver(smtp, message)
+        return smtp, sent_count + 1
+
+    async def _send_with_retry(self, smtp, sent_count, message):
+        """Wait for the rate limiter and retry after throttling replies."""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            if self.limiter is not None:
+                delay = self.limiter.reserve()
+                if delay > 0:
+                    SMTP_RATE_LIMIT_WAIT_SECONDS.inc(delay)
+                    await asyncio.sleep(delay)
+            try:
+                smtp, sent_count = await self._send(smtp, sent_count, message)
+            except Exception as e:
+                if self.limiter is None:
+                    raise
+                if not is_throttle_error(e) or attempt == MAX_SEND_ATTEMPTS:
+                    self.limiter.release()
+                    raise
+                self.limiter.record_throttle(e)
+                SMTP_RETRIES.labels("throttle").inc()
+                # Throttling replies usually come with a dropped connection
+                await self._close(smtp)
+                smtp = None
+                continue
+            if self.limiter is not None:
+                self.limiter.record_success()
+            return smtp, sent_count
+
+    async def _worker(self, jobs, deliver, stop):
+        smtp = None
+        sent_count = 0
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    job = jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                DELIVERY_QUEUE_DEPTH.dec()
+                try:
+                    smtp, sent_count = await self._send_with_retry(smtp, sent_count, job.message)
+                    result = DeliveryResult(job, True)
+                except DailyQuotaExceeded:
+                    # Not sent: this job and the rest stay unrecorded for a later run
+                    self.quota_exceeded = True
+                    if stop is not None:
+                        stop.set()
+                    break
+                except Exception as e:
+                    result = DeliveryResult(job, False, e)
+                await deliver(result)
+        finally:
+            await self._close(smtp)
+
+    async def arun(self, jobs, on_result=None, stop=None):
+        """
+        Send all jobs on the running event loop.
+        on_result may be a coroutine function or a plain function; plain functions
+        (e.g. Google Sheets writes) run on a single bookkeeping thread so they
+        overlap with in-flight SMTP conversations without racing each other.
+        Setting the optional threading.Event stop lets workers finish their
+        current message and then exit. When the daily budget runs out, the
+        sessions finish their current message and the rest is left unsent
+        (see quota_exceeded).
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        job_queue = asyncio.Queue()
+        for job in jobs:
+            job_queue.put_nowait(job)
+        DELIVERY_QUEUE_DEPTH.set(len(jobs))
+
+        loop = asyncio.get_running_loop()
+        bookkeeping = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bookkeeping")
+
+        async def deliver(result):
+            if on_result is None:
+                return
+            if asyncio.iscoroutinefunction(on_result):
+                await on_result(result)
+            else:
+                await loop.run_in_executor(bookkeeping, on_result, result)
+
+        workers = min(self.concurrency, len(jobs))
+        logging.info(f"📨 Sending {len(jobs)} emails with {workers} concurrent asyncio SMTP session(s)")
+        if self.limiter is not None:
+            self.limiter.log_projection(len(jobs))
+        try:
+            await asyncio.gather(*(self._worker(job_queue, deliver, stop) for _ in range(workers)))
+        finally:
+            bookkeeping.shutdown(wait=True)
+            DELIVERY_QUEUE_DEPTH.set(0)
+
+    def run(self, jobs):
+        """
+        Send all jobs, yielding a DeliveryResult for each one as it completes.
+        If the consumer stops early, the results of messages still in flight
+        are kept for take_pending_results().
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        results = queue.Queue()
+        errors = []
+        stop = threading.Event()
+
+        async def collect(result):
+            results.put(result)
+
+        def run_loop():
+            try:
+                asyncio.run(self.arun(jobs, on_result=collect, stop=stop))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                results.put(None)
+
+        thread = threading.Thread(target=run_loop, daemon=True)
+        thread.start()
+        try:
+            while True:
+                result = results.get()
+                if result is None:
+                    break
+                yield result
+        finally:
+            # Consumer stopped early (Ctrl-C, exception): let sessions finish their current message
+            stop.set()
+            thread.join()
+            # Messages finished after the consumer stopped: sent, but not yet recorded
+            while not results.empty():
+                result = results.get_nowait()
+                if result is not None:
+                    self.pending_results.append(result)
+        if errors:
+            raise errors[0]
+
+    def take_pending_results(self):
+        """Results that run() could not yield because its consumer stopped early; record them."""
+        pending, self.pending_results = self.pending_results, []
+        return pending
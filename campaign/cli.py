@@ -0,0 +1,85 @@
+"""
+Command line options shared by the campaign scripts.
+"""
+
+from campaign import metrics
+from campaign.engine import BACKEND_THREADS, BACKENDS, DEFAULT_WORKERS
+
+# Personalised attachments: every file in ATTACHMENTS_DIR/<email>/ goes to that recipient
+ATTACHMENTS_DIR = "attachments"
+
+# Subcommand that builds the tracking CSV/Excel copy from the delivery journal
+COMMAND_REPORT = "report"
+
+
+def add_delivery_arguments(parser):
+    """--workers, --backend and the metrics export options."""
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Number of parallel SMTP connections used for sending (default: {DEFAULT_WORKERS})'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default=BACKEND_THREADS,
+        help='Delivery backend: worker threads or asyncio (needs aiosmtplib)'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        default=metrics.METRICS_FILE,
+        metavar='PATH',
+        help='Write timing and throughput metrics in the Prometheus text format to PATH on exit (default: METRICS_FILE)'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=metrics.METRICS_PORT,
+        metavar='PORT',
+        help=f'Serve live metrics on http://{metrics.METRICS_HOST}:PORT/metrics while running (default: METRICS_PORT)'
+    )
+
+
+def start_metrics_export(args):
+    """Start the metrics endpoint and the exit-time textfile requested by --metrics-port/--metrics-file."""
+    if args.metrics_port is not None:
+        metrics.start_http_server(args.metrics_port)
+    if args.metrics_file:
+        metrics.write_textfile_at_exit(args.metrics_file)
+
+
+def add_csv_campaign_arguments(parser):
+    """
+    Delivery options plus --attachments and --stream for the Orders
+    CSV campaigns, and the optional 'report' command (with --no-excel).
+    """
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=[COMMAND_REPORT],
+        help=f"'{COMMAND_REPORT}': write the tracking CSV (and Excel) copy of the export from the delivery journal"
+    )
+    parser.add_argument(
+        '--no-excel',
+        action='store_true',
+        help=f'With {COMMAND_REPORT}: write the CSV copy only'
+    )
+    add_delivery_arguments(parser)
+    parser.add_argument(
+        '--attachments',
+        nargs='?',
+        const=ATTACHMENTS_DIR,
+        metavar='DIR',
+        help=f'Attach every file in DIR/<email>/ to that recipient\'s email (default DIR: {ATTACHMENTS_DIR})'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Read the CSV in chunks and start sending before it is fully parsed (large season exports)'
+    )
+
+
+def confirm(prompt="⚠️  This will send emails to ALL recipients. Continue? (yes/no): "):
+    """Ask for a literal 'yes' before sending."""
+    return input(prompt).lower() == 'yes'
@@ -0,0 +1,131 @@
+"""
+Persistent index of delivered campaigns, keyed by normalised address.
+One SQLite table shared by every campaign and every run: "did this address
+already receive campaign X" is a primary-key lookup instead of a rescan of
+output CSVs or journals, and a campaign never mails the same mailbox twice
+however its address is spelled in the next export.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+from campaign.addresses import normalize_email
+
+DEFAULT_INDEX_PATH = os.getenv("DELIVERY_INDEX", os.path.join("data", "deliveries.sqlite3"))
+# Addresses per query in bulk lookups (SQLite's variable limit is 999 on old builds)
+LOOKUP_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    campaign TEXT NOT NULL,
+    address TEXT NOT NULL,
+    email TEXT NOT NULL,
+    sent_at TEXT NOT NULL,
+    PRIMARY KEY (campaign, address)
+) WITHOUT ROWID
+"""
+
+
+class DeliveryIndex:
+    """(campaign, normalised address) -> first delivery, in a SQLite file."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, read_only=False):
+        self.path = path
+        if read_only:
+            # Lookups only (simulations): the file must exist and is left untouched. Without
+            # a -wal file everything is in the main file, which is read as immutable so no
+            # -wal/-shm files are created; otherwise a writer is active and they exist anyway
+            mode = "mode=ro" if os.path.exists(path + "-wal") else "immutable=1"
+            uri = f"file:{pathname2url(os.path.abspath(path))}?{mode}"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def received(self, email, campaign):
+        """sent_at of the address's delivery of campaign, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sent_at FROM deliveries WHERE campaign = ? AND address = ?",
+                (campaign, normalize_email(email)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def received_many(self, emails, campaign):
+        """{normalised address: sent_at} for those of emails that already received campaign."""
+        addresses = list({normalize_email(email) for email in emails})
+        found = {}
+        with self._lock:
+            for start in range(0, len(addresses), LOOKUP_BATCH_SIZE):
+                batch = addresses[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT address, sent_at FROM deliveries WHERE campaign = ? AND address IN ({placeholders})",
+                    (campaign, *batch),
+                ))
+        return found
+
+    def campaign_addresses(self, campaign):
+        """{normalised address: sent_at} of every delivery of campaign."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT address, sent_at FROM deliveries WHERE campaign = ?", (campaign,)
+            ))
+
+    def record(self, email, campaign, sent_at=None):
+        """Remember a delivery; the first one of an address and campaign is kept."""
+        sent_at = sent_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO deliveries (campaign, address, email, sent_at) VALUES (?, ?, ?, ?)",
+                (campaign, normalize_email(email), str(email).strip(), sent_at),
+            )
+            self._conn.commit()
+
+    def record_many(self, deliveries, campaign):
+        """record() every {email: sent_at} in one transaction; returns how many were new."""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = [
+            (campaign, normalize_email(email), str(email).strip(), sent_at or now)
+            for email, sent_at in deliveries.items()
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (campaign, address, email, sent_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_delivery_index(path=DEFAULT_INDEX_PATH, read_only=False):
+    """Return the shared DeliveryIndex for path, opening it on first use."""
+    with _indexes_lock:
+        index = _indexes.get((path, read_only))
+        if index is None:
+            index = DeliveryIndex(path, read_only)
+            _indexes[(path, read_only)] = index
+        return index
@@ -0,0 +1,181 @@
+"""
+Concurrent delivery engine for prepared email messages.
+A bounded set of worker threads each own one pooled SMTP session and
+consume a shared queue of jobs; results are handed back to the calling
+thread so sheet/CSV bookkeeping stays single-threaded.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from campaign.metrics import DELIVERY_QUEUE_DEPTH, SMTP_RATE_LIMIT_WAIT_SECONDS, SMTP_RETRIES
+from campaign.rate_limit import MAX_SEND_ATTEMPTS, DailyQuotaExceeded, is_throttle_error
+
+DEFAULT_WORKERS = int(os.getenv("SMTP_WORKERS", "4"))
+
+# Delivery backends selectable via --backend
+BACKEND_THREADS = "threads"
+BACKEND_ASYNCIO = "asyncio"
+BACKENDS = (BACKEND_THREADS, BACKEND_ASYNCIO)
+
+
+class DeliveryJob:
+    """A prepared message plus whatever the caller needs to record the outcome."""
+
+    __slots__ = ("to_email", "message", "context")
+
+    def __init__(self, to_email, message, context=None):
+        self.to_email = to_email
+        self.message = message
+        self.context = context
+
+
+class DeliveryResult:
+    """Outcome of a single DeliveryJob."""
+
+    __slots__ = ("job", "success", "error")
+
+    def __init__(self, job, success, error=None):
+        self.job = job
+        self.success = success
+        self.error = error
+
+    @property
+    def to_email(self):
+        return self.job.to_email
+
+    @property
+    def context(self):
+        return self.job.context
+
+
+class DeliveryEngine:
+    """Send DeliveryJobs over N parallel SMTP sessions taken from an SMTPPool."""
+
+    def __init__(self, pool, workers=DEFAULT_WORKERS, limiter=None):
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.limiter = limiter
+        self.pending_results = []
+        # Set when the daily budget ran out; the jobs not sent by then get no result
+        self.quota_exceeded = False
+
+    def _send(self, session, job):
+        """Send one job, waiting for the rate limiter and retrying after throttling replies."""
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            if self.limiter is not None:
+                started = time.perf_counter()
+                self.limiter.wait()
+                SMTP_RATE_LIMIT_WAIT_SECONDS.inc(time.perf_counter() - started)
+            try:
+                session.send_message(job.message)
+            except Exception as e:
+                if self.limiter is None:
+                    raise
+                if not is_throttle_error(e) or attempt == MAX_SEND_ATTEMPTS:
+                    self.limiter.release()
+                    raise
+                self.limiter.record_throttle(e)
+                SMTP_RETRIES.labels("throttle").inc()
+                # Throttling replies usually come with a dropped connection
+                session.close()
+                continue
+            if self.limiter is not None:
+                self.limiter.record_success()
+            return
+
+    def _worker(self, jobs, results, stop):
+        try:
+            with self.pool.session() as session:
+                while not stop.is_set():
+                    job = jobs.get()
+                    if job is None:
+                        break
+                    DELIVERY_QUEUE_DEPTH.dec()
+                    try:
+                        self._send(session, job)
+                        results.put(DeliveryResult(job, True))
+                    except DailyQuotaExceeded:
+                        # Not sent: this job and the rest stay unrecorded for a later run
+                        self.quota_exceeded = True
+                        stop.set()
+                    except Exception as e:
+                        results.put(DeliveryResult(job, False, e))
+        finally:
+            # Tells run() this worker is done
+            results.put(None)
+
+    def run(self, jobs):
+        """
+        Send all jobs, yielding a DeliveryResult for each one as it completes.
+        If the consumer stops early, the results of messages still in flight
+        are kept for take_pending_results(). When the daily budget runs out,
+        the messages in flight are finished and the rest get no result
+        (see quota_exceeded).
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        workers = min(self.workers, len(jobs))
+        self.pool.resize(workers)
+
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        DELIVERY_QUEUE_DEPTH.set(len(jobs))
+        for _ in range(workers):
+            job_queue.put(None)
+
+        results = queue.Queue()
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._worker, args=(job_queue, results, stop), daemon=True)
+            for _ in range(workers)
+        ]
+        logging.info(f"📨 Sending {len(jobs)} emails with {workers} parallel SMTP connection(s)")
+        if self.limiter is not None:
+            self.limiter.log_projection(len(jobs))
+        for thread in threads:
+            thread.start()
+
+        try:
+            running = workers
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                    continue
+                yield result
+        finally:
+            # Consumer stopped early (Ctrl-C, exception): let workers finish their current message
+            stop.set()
+            for _ in range(workers):
+                job_queue.put(None)
+            for thread in threads:
+                thread.join()
+            DELIVERY_QUEUE_DEPTH.set(0)
+            # Messages the workers finished after the consumer stopped: sent, but not yet recorded
+            while not results.empty():
+                result = results.get_nowait()
+                if result is not None:
+                    self.pending_results.append(result)
+
+    def take_pending_results(self):
+        """Results that run() could not yield because its consumer stopped early; record them."""
+        pending, self.pending_results = self.pending_results, []
+        return pending
+
+
+def create_engine(backend, pool, workers=DEFAULT_WORKERS, limiter=None):
+    """Create the delivery engine for the selected backend, using the pool's SMTP settings."""
+    if backend == BACKEND_ASYNCIO:
+        from campaign.async_engine import AsyncDeliveryEngine
+        return AsyncDeliveryEngine(
+            pool.server, pool.port, pool.username, pool.password,
+            concurrency=workers, max_messages_per_session=pool.max_messages_per_session,
+            timeout=pool.timeout, limiter=limiter, starttls=pool.starttls, ca_file=pool.ca_file
+        )
+    return DeliveryEngine(pool, workers=workers, limiter=limiter)
@@ -0,0 +1,185 @@
+"""
+In-memory stand-in for a gspread Worksheet.
+Holds the grid in a list of rows and implements the Worksheet calls the
+campaigns make (get_all_values, row_values, col_values, update_cell,
+update, batch_update, format, batch_format), so the whole pipeline can be
+run and benchmarked offline. Every call can be slowed down by an
+artificial round-trip latency, and per-minute read/write quotas answer
+with the same 429 APIError the real API raises.
+"""
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import requests
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range
+
+# Same window the Sheets API uses for its per-minute quotas
+QUOTA_WINDOW = 60.0
+
+
+def quota_error(kind):
+    """The 429 APIError the Sheets API answers with when a quota is used up."""
+    response = requests.Response()
+    response.status_code = 429
+    response._content = json.dumps({"error": {
+        "code": 429,
+        "message": f"Quota exceeded for quota metric '{kind.capitalize()} requests' (fake sheet)",
+        "status": "RESOURCE_EXHAUSTED",
+    }}).encode()
+    return APIError(response)
+
+
+class FakeSpreadsheet:
+    """The parts of gspread's Spreadsheet the snapshot cache looks at."""
+
+    def __init__(self, spreadsheet_id):
+        self.id = spreadsheet_id
+        self.last_update = datetime.now(timezone.utc)
+
+    def get_lastUpdateTime(self):
+        return self.last_update.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    def touch(self):
+        self.last_update = datetime.now(timezone.utc)
+
+
+class FakeWorksheet:
+    """An in-memory grid answering the Worksheet calls used by the campaigns."""
+
+    def __init__(self, rows=(), latency=0.0, reads_per_minute=None, writes_per_minute=None,
+                 spreadsheet_id="fake", title="Sheet1"):
+        self.rows = [[str(value) for value in row] for row in rows]
+        self.formats = {}
+        self.latency = latency
+        self.quotas = {"read": reads_per_minute, "write": writes_per_minute}
+        self.spreadsheet = FakeSpreadsheet(spreadsheet_id)
+        self.id = 0
+        self.title = title
+        self.requests = {"read": 0, "write": 0}
+        self.rejected = 0
+        self._calls = {"read": deque(), "write": deque()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """A worksheet holding the rows of a CSV file (first row = headers)."""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return cls(csv.reader(f), **kwargs)
+
+    def save(self, path):
+        """Write the grid to a CSV file, e.g. to keep the state between runs."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(self.rows)
+
+    @property
+    def spreadsheet_id(self):
+        return self.spreadsheet.id
+
+    def _request(self, kind):
+        """Account for one API request: quota check, then the simulated round trip."""
+        with self._lock:
+            self.requests[kind] += 1
+            limit = self.quotas[kind]
+            if limit:
+                calls = self._calls[kind]
+                now = time.monotonic()
+                while calls and now - calls[0] >= QUOTA_WINDOW:
+                    calls.popleft()
+                if len(calls) >= limit:
+                    self.rejected += 1
+                    raise quota_error(kind)
+                calls.append(now)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _set(self, row, col, value):
+        """Set a 1-based cell, growing the grid as needed."""
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        if len(cells) < col:
+            cells.extend([""] * (col - len(cells)))
+        cells[col - 1] = "" if value is None else str(value)
+
+    def _write_range(self, range_name, values):
+        start = a1_range_to_grid_range(range_name)
+        first_row = start.get("startRowIndex", 0) + 1
+        first_col = start.get("startColumnIndex", 0) + 1
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._set(first_row + r, first_col + c, value)
+
+    def _modified(self):
+        self.spreadsheet.touch()
+
+    # Reads
+
+    def get_all_values(self):
+        """All rows padded to the same width, like gspread's fill_gaps."""
+        self._request("read")
+        width = max((len(row) for row in self.rows), default=0)
+        return [row + [""] * (width - len(row)) for row in self.rows]
+
+    def row_values(self, row):
+        self._request("read")
+        if row > len(self.rows):
+            return []
+        cells = list(self.rows[row - 1])
+        while cells and cells[-1] == "":
+            cells.pop()
+        return cells
+
+    def col_values(self, col):
+        self._request("read")
+        cells = [row[col - 1] if col <= len(row) else "" for row in self.rows]
+        while cells and cells[-1] == "":
+            cells.pop()
+        return cells
+
+    # Writes
+
+    def update_cell(self, row, col, value):
+        self._request("write")
+        self._set(row, col, value)
+        self._modified()
+
+    def update(self, values, range_name=None, raw=True, **kwargs):
+        self._request("write")
+        self._write_range(range_name or "A1", values)
+        self._modified()
+
+    def batch_update(self, data, raw=True, **kwargs):
+        self._request("write")
+        for entry in data:
+            self._write_range(entry["range"], entry["values"])
+        self._modified()
+
+    def format(self, ranges, cell_format):
+        self._request("write")
+        for range_name in [ranges] if isinstance(ranges, str) else ranges:
+            self.formats[range_name] = cell_format
+        self._modified()
+
+    def batch_format(self, formats):
+        self._request("write")
+        for entry in formats:
+            self.formats[entry["range"]] = entry["format"]
+        self._modified()
+
+    # Inspection helpers for tests and benchmarks
+
+    def cell(self, row, col):
+        """Value of a 1-based cell ('' outside the grid); not counted as a request."""
+        if row > len(self.rows) or col > len(self.rows[row - 1]):
+            return ""
+        return self.rows[row - 1][col - 1]
+
+    def cell_format(self, a1):
+        """Format last applied to an A1 cell, or None; not counted as a request."""
+        return self.formats.get(a1)
@@ -0,0 +1,67 @@
+"""
+Append-only delivery journal for the CSV campaign scripts.
+Every successful send is appended as one JSON line and fsync'd, so a crash,
+Ctrl-C or SMTP lockout mid-campaign loses nothing. The next run copies
+journaled deliveries the delivery index does not know yet into it, so they
+are skipped, and `report` builds the tracking copy from the journal.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+
+
+def journal_path_for(output_file):
+    """Journal file that belongs to a campaign output CSV."""
+    return os.path.splitext(output_file)[0] + "_journal.jsonl"
+
+
+class SendJournal:
+    """JSONL journal of delivered emails ({"email", "sent_at", ...} per line)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def load_sent(self):
+        """Return {email: sent_at} for every journaled delivery."""
+        sent = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a torn last line behind
+                        logging.warning(f"Ignoring unreadable journal line {line_number} in {self.path}")
+                        continue
+                    sent[entry["email"]] = entry.get("sent_at", "")
+        except FileNotFoundError:
+            pass
+        return sent
+
+    def record(self, email, sent_at=None, **fields):
+        """Append one delivery and force it to disk before returning."""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = {"email": email, "sent_at": sent_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        entry.update(fields)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
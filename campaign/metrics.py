@@ -0,0 +1,304 @@
+"""
+Runtime metrics of the campaign scripts.
+Counters, gauges and latency histograms around the hot paths (sheet API
+calls, rendering, SMTP connect/STARTTLS/AUTH/DATA, the delivery queue)
+kept in process and exported in the Prometheus text format: as a textfile
+written when the script exits (node_exporter's textfile collector reads
+it, or just open it) and, optionally, on a live HTTP endpoint that
+Prometheus can scrape during long campaigns. No client library needed.
+"""
+
+import atexit
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# METRICS_FILE: textfile written at exit; METRICS_PORT: serve /metrics while running
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+# Only local scrapers by default; 0.0.0.0 exposes the endpoint to the network
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; from sub-millisecond template renders to quota-throttled sheet calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Registry:
+    """The metrics of one process, in registration order."""
+
+    def __init__(self):
+        self.metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(existing.name == metric.name for existing in self.metrics):
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics.append(metric)
+        return metric
+
+    def exposition(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self.metrics):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """The series for one combination of label values (created on first use)."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """(name suffix, [(label, value)], value) of every series."""
+        for key, child in sorted(self._children.items()):
+            labels = list(zip(self.labelnames, key))
+            for suffix, extra, value in child.samples():
+                yield suffix, labels + extra, value
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield "", [], self.value
+
+
+class _GaugeValue(_Value):
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = float(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the seconds spent in the with-block (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield "_bucket", [("le", _format_value(bound))], cumulative
+        yield "_sum", [], total
+        yield "_count", [], cumulative
+
+
+class Counter(_Metric):
+    """Monotonic total; name it ..._total."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (queue depths)."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    """Distribution of durations in seconds, with cumulative buckets, _sum and _count."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+# Google Sheets
+SHEET_REQUEST_SECONDS = Histogram(
+    "campaign_sheet_request_seconds", "Latency of Sheets API requests (without quota waits).", ["kind"]
+)
+SHEET_QUOTA_WAIT_SECONDS = Counter(
+    "campaign_sheet_quota_wait_seconds_total", "Time spent waiting for the per-minute Sheets quota.", ["kind"]
+)
+SHEET_RETRIES = Counter(
+    "campaign_sheet_retries_total", "Sheets API requests retried after 429/5xx replies or dropped connections.", ["kind"]
+)
+SHEET_PENDING_WRITES = Gauge(
+    "campaign_sheet_pending_writes", "Cell ranges and formats queued in the sheet write buffer."
+)
+
+# Pipeline
+STAGE_SECONDS = Counter(
+    "campaign_stage_seconds_total", "Wall time of the pipeline stages (load, plan, deliver).", ["campaign", "stage"]
+)
+RENDER_SECONDS = Histogram(
+    "campaign_render_seconds", "Time to render one message.", ["campaign"]
+)
+MESSAGES = Counter(
+    "campaign_messages_total", "Messages handed to the SMTP server, by outcome.", ["campaign", "outcome"]
+)
+DELIVERY_QUEUE_DEPTH = Gauge(
+    "campaign_delivery_queue_depth", "Rendered messages waiting for a free SMTP session."
+)
+
+# SMTP; phase 'data' is one message from MAIL FROM to the reply after the payload
+SMTP_SECONDS = Histogram(
+    "campaign_smtp_seconds", "Latency of SMTP connect, STARTTLS, AUTH and message transfer.", ["phase"]
+)
+SMTP_RETRIES = Counter(
+    "campaign_smtp_retries_total", "Messages retried after a throttling reply or a dropped session.", ["reason"]
+)
+SMTP_RATE_LIMIT_WAIT_SECONDS = Counter(
+    "campaign_smtp_rate_limit_wait_seconds_total", "Time SMTP sessions spent waiting for the provider rate limit."
+)
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Write the metrics to path atomically (the textfile collector must never see half a file)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.exposition())
+    os.replace(tmp_path, path)
+
+
+def write_textfile_at_exit(path, registry=REGISTRY):
+    """Write the metrics to path when the script exits (also after Ctrl-C or a crash)."""
+    def write():
+        try:
+            write_textfile(path, registry)
+            logging.info(f"📈 Metrics written to {path}")
+        except OSError as e:
+            logging.error(f"Failed to write metrics to {path}: {e}")
+    atexit.register(write)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the campaign log
+        pass
+
+
+def start_http_server(port, host=METRICS_HOST, registry=REGISTRY):
+    """Serve /metrics on a background thread for the rest of the run; returns the server."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"📈 Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
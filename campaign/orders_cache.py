@@ -0,0 +1,144 @@
+"""
+Columnar cache of Eventfrog Orders exports.
+The CSV (with its multiline quoted check-in column) is parsed once and
+stored as an uncompressed Feather file with Category/Status as
+categoricals. Later campaign runs memory-map that file instead of parsing
+the CSV again and convert only the columns they ask for to pandas (that
+conversion is a copy; the other columns are never read from disk). The
+cache is tagged with the SHA-256 of the CSV and is rebuilt automatically
+when the export changes.
+
+Requires the optional 'pyarrow' package (uv sync --extra columnar);
+without it exports are read from the CSV as before.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+CACHE_DIR = os.path.join(".cache", "orders")
+CATEGORICAL_COLUMNS = ("Category", "Status")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """SHA-256 of the file at path, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(csv_path, cache_dir=CACHE_DIR):
+    """(feather path, metadata path) of the cache for csv_path."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    base = os.path.join(cache_dir, name)
+    return base + ".feather", base + ".json"
+
+
+def read_orders_csv(csv_path, columns=None):
+    """Parse the export (only columns, if given) and give every column a single type for the columnar file."""
+    usecols = (lambda column: column in columns) if columns is not None else None
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", low_memory=False, usecols=usecols)
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype("category")
+        elif df[column].dtype == object:
+            # Mixed values (e.g. numeric IDs next to text) cannot be stored as one Arrow type
+            df[column] = df[column].astype("string")
+    return df
+
+
+def _source_version(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cached_hash(meta, csv_path):
+    """Hash of the CSV, reusing the one in meta when size and mtime are unchanged."""
+    version = _source_version(csv_path)
+    if meta and all(meta.get(key) == value for key, value in version.items()):
+        return meta["sha256"]
+    return file_hash(csv_path)
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def import_orders(csv_path, cache_dir=CACHE_DIR, sha256=None):
+    """Convert the export into the columnar cache; returns the DataFrame that was written."""
+    if feather is None:
+        raise RuntimeError("The orders cache needs pyarrow. Install it with: uv sync --extra columnar")
+    df = read_orders_csv(csv_path)
+    data_path, meta_path = cache_paths(csv_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Uncompressed, so later runs can memory-map the file instead of reading it
+    tmp_path = data_path + ".tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, data_path)
+
+    meta = {
+        "source": os.path.abspath(csv_path),
+        "sha256": sha256 or file_hash(csv_path),
+        "rows": len(df),
+        **_source_version(csv_path),
+    }
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+    logging.info(f"📦 Cached {len(df)} orders from {csv_path} in {data_path}")
+    return df
+
+
+def _select_columns(df, columns):
+    if columns is None:
+        return df
+    return df[[column for column in df.columns if column in columns]]
+
+
+def load_orders(csv_path, use_cache=True, cache_dir=CACHE_DIR, columns=None):
+    """
+    Return the export as a DataFrame, memory-mapping the columnar cache when it
+    matches the CSV's hash and (re)building it otherwise.
+    columns limits the DataFrame to those of the export's columns (all by default).
+    """
+    if not use_cache or feather is None:
+        return read_orders_csv(csv_path, columns)
+
+    data_path, meta_path = cache_paths(csv_path, cache_dir)
+    meta = _read_meta(meta_path)
+    sha256 = _cached_hash(meta, csv_path)
+    if meta and meta.get("sha256") == sha256 and os.path.exists(data_path):
+        try:
+            table = feather.read_table(data_path, memory_map=True)
+            if columns is not None:
+                table = table.select([column for column in table.column_names if column in columns])
+            # Convert column by column, releasing each Arrow column once it is in pandas
+            df = table.to_pandas(self_destruct=True, split_blocks=True)
+            del table
+            logging.info(f"📦 Orders export unchanged, using columnar cache ({len(df)} rows)")
+            return df
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read orders cache, re-importing: {e}")
+
+    try:
+        return _select_columns(import_orders(csv_path, cache_dir, sha256=sha256), columns)
+    except OSError as e:
+        logging.warning(f"Could not write orders cache: {e}")
+        return read_orders_csv(csv_path, columns)
@@ -0,0 +1,421 @@
+"""
+Campaign pipeline shared by all send scripts:
+source -> filter/dedup -> render -> deliver -> record.
+A script only declares its Campaign (where recipients come from, which
+template they get and how its fields are derived); connection pooling,
+rate limiting, parallel delivery, journaling, the delivery index and
+skipping addresses that already got the mail live here once.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from tqdm import tqdm
+
+from campaign.addresses import normalize_email
+from campaign.assets import personal_attachments
+from campaign.delivery_index import DEFAULT_INDEX_PATH, get_delivery_index
+from campaign.engine import BACKEND_THREADS, DEFAULT_WORKERS, DeliveryJob, create_engine
+from campaign.journal import SendJournal
+from campaign.metrics import MESSAGES, RENDER_SECONDS, STAGE_SECONDS
+from campaign.suppression import DEFAULT_SUPPRESSION_PATH, REASON_BOUNCE, get_suppression_list, is_permanent_failure
+from campaign.rate_limit import RateLimiter
+from campaign import settings
+
+# Run modes
+MODE_SIMULATE = "simulate"      # analyse the source, send nothing
+MODE_PREVIEW = "preview"        # log every message and record it as a preview, send nothing
+MODE_DRY_RUN = "dry-run"        # send the campaign's test messages only
+MODE_PRODUCTION = "production"  # send to every selected recipient and record the outcome
+MODES = (MODE_SIMULATE, MODE_PREVIEW, MODE_DRY_RUN, MODE_PRODUCTION)
+
+# Recipients handed to the delivery engine at a time when a source streams them
+STREAM_BATCH_SIZE = 500
+
+
+class Recipient:
+    """One message to send: address, source data for the template and bookkeeping context."""
+
+    __slots__ = ("email", "data", "context", "attachments")
+
+    def __init__(self, email, data=None, context=None, attachments=()):
+        self.email = email
+        self.data = data or {}
+        self.context = context
+        self.attachments = attachments
+
+
+class Campaign:
+    """
+    Declarative description of a mail campaign.
+    source: where recipients come from and where outcomes are recorded (see campaign.sources)
+    template: CompiledTemplate every recipient gets
+    fields: callable(data) -> template fields for one recipient
+    describe: optional callable(recipient) -> preview lines for simulate/preview output
+    test_recipients: Recipients that get the mail in dry-run mode
+    journal_path: JSONL delivery journal (for the tracking copy), or None
+    report: optional callable(recipients) logging campaign-specific simulation details
+    index_path: delivery index shared by all campaigns (see campaign.delivery_index), or None
+    once_per_address: skip addresses the index lists as having received this campaign
+                      (False when one address may legitimately get several messages)
+    suppression_path: global suppression list (see campaign.suppression), or None
+    """
+
+    def __init__(self, name, source, template, fields, describe=None, test_recipients=(),
+                 journal_path=None, report=None, index_path=DEFAULT_INDEX_PATH, once_per_address=True,
+                 suppression_path=DEFAULT_SUPPRESSION_PATH):
+        self.name = name
+        self.source = source
+        self.template = template
+        self.fields = fields
+        self.describe = describe or (lambda recipient: [f"To: {recipient.email}"])
+        self.test_recipients = list(test_recipients)
+        self.journal_path = journal_path
+        self.report = report
+        self.index_path = index_path
+        self.once_per_address = once_per_address
+        self.suppression_path = suppression_path
+
+    def render(self, recipient):
+        """Render the OutgoingMessage for one recipient."""
+        with RENDER_SECONDS.labels(self.name).time():
+            return self.template.render(recipient.email, recipient.attachments, **self.fields(recipient.data))
+
+
+class CampaignStats:
+    """Counters of one campaign run."""
+
+    def __init__(self, selected=0):
+        self.selected = selected
+        self.sent = 0
+        self.failed = 0
+        # Dropped before sending: already received the campaign / on the suppression list
+        self.skipped = 0
+        self.suppressed = 0
+        # Selected but left for a later run because the daily sending budget ran out
+        self.unsent = 0
+
+    def log(self, mode):
+        logging.info(f"\n{'='*60}")
+        logging.info("📊 Summary:")
+        if mode == MODE_PREVIEW:
+            logging.info(f"🧪 Would have sent: {self.sent}")
+        else:
+            logging.info(f"✅ Emails sent: {self.sent}")
+            logging.info(f"❌ Failed: {self.failed}")
+        if self.skipped:
+            logging.info(f"⏭️  Already received: {self.skipped}")
+        if self.suppressed:
+            logging.info(f"🚫 Suppressed: {self.suppressed}")
+        if self.unsent:
+            logging.info(f"⏸️  Left for a later run: {self.unsent}")
+        logging.info(f"{'='*60}\n")
+
+
+def _banner(text):
+    logging.info(f"\n{'='*60}")
+    logging.info(text)
+    logging.info(f"{'='*60}\n")
+
+
+def _timestamp():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+@contextmanager
+def _stage(campaign, stage):
+    """Add the wall time of the with-block to the campaign's stage metric."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(campaign.name, stage).inc(time.perf_counter() - started)
+
+
+def attach_personal_files(recipients, attachments_dir):
+    """Give every recipient the files in attachments_dir/<email>/."""
+    with_files = 0
+    for recipient in recipients:
+        recipient.attachments = personal_attachments(attachments_dir, recipient.email)
+        with_files += bool(recipient.attachments)
+    logging.info(f"📎 Personal attachments from {attachments_dir}/ for {with_files} recipients")
+
+
+def stream_personal_files(recipients, attachments_dir):
+    """attach_personal_files() for a stream of recipients, one recipient at a time."""
+    for recipient in recipients:
+        recipient.attachments = personal_attachments(attachments_dir, recipient.email)
+        yield recipient
+
+
+def open_journal(campaign, index=None):
+    """
+    Open the delivery journal and make sure the addresses it lists are not mailed again.
+    With a delivery index the index decides: journaled deliveries it does not
+    know yet (runs from before the index existed) are added to it. Without
+    one, the source is told which addresses are done.
+    """
+    journal = SendJournal(campaign.journal_path)
+    journaled = journal.load_sent()
+    if not journaled:
+        return journal
+    if index is not None and campaign.once_per_address:
+        added = index.record_many(journaled, campaign.name)
+        if added:
+            logging.info(f"📒 {added} delivery(ies) from {journal.path} added to {index.path}")
+    else:
+        campaign.source.mark_sent(journaled)
+        logging.info(f"⏭️  {len(journaled)} address(es) already sent according to {journal.path}, skipping")
+    return journal
+
+
+def _lazy_skip(recipients, skip, stats, counter):
+    """Yield the recipients skip() keeps, counting the others in stats.<counter>."""
+    for recipient in recipients:
+        if skip(recipient):
+            setattr(stats, counter, getattr(stats, counter) + 1)
+        else:
+            yield recipient
+
+
+def skip_received(campaign, index, recipients, stats):
+    """Drop recipients the delivery index lists as having received campaign (lazily for streams)."""
+    if not isinstance(recipients, list):
+        return _lazy_skip(
+            recipients, lambda recipient: index.received(recipient.email, campaign.name) is not None, stats, "skipped"
+        )
+    received = index.received_many((recipient.email for recipient in recipients), campaign.name)
+    if not received:
+        return recipients
+    logging.info(f"⏭️  {len(received)} address(es) already received '{campaign.name}' according to {index.path}, skipping")
+    kept = [recipient for recipient in recipients if normalize_email(recipient.email) not in received]
+    stats.skipped += len(recipients) - len(kept)
+    return kept
+
+
+def skip_suppressed(suppressions, recipients, stats):
+    """Drop suppressed recipients (bounced, unsubscribed; lazily for streams)."""
+    if not isinstance(recipients, list):
+        return _lazy_skip(
+            recipients, lambda recipient: suppressions.reason(recipient.email) is not None, stats, "suppressed"
+        )
+    suppressed = suppressions.suppressed_many(recipient.email for recipient in recipients)
+    if not suppressed:
+        return recipients
+    logging.info(f"🚫 {len(suppressed)} suppressed address(es) according to {suppressions.path}, skipping")
+    kept = [recipient for recipient in recipients if normalize_email(recipient.email) not in suppressed]
+    stats.suppressed += len(recipients) - len(kept)
+    return kept
+
+
+def _open_store(get_store, path, read_only):
+    """get_store(path) (delivery index, suppression list), or None without a path or a file to read."""
+    if not path or (read_only and not os.path.exists(path)):
+        return None
+    return get_store(path, read_only=read_only)
+
+
+def _batches(recipients, size=STREAM_BATCH_SIZE):
+    """A list as one batch, any other iterable in lists of up to size recipients."""
+    if isinstance(recipients, list):
+        yield recipients
+        return
+    recipients = iter(recipients)
+    while batch := list(islice(recipients, size)):
+        yield batch
+
+
+def record_result(campaign, result, stats, journal=None, index=None, suppressions=None):
+    """Record one DeliveryResult in the source, the journal, the delivery index and the suppression list."""
+    if result.success:
+        logging.info(f"✅ Email sent to {result.to_email}")
+        sent_at = _timestamp()
+        campaign.source.record(result.context, True, sent_at)
+        if journal is not None:
+            journal.record(result.to_email, sent_at=sent_at, rows=result.context.context)
+        if index is not None:
+            index.record(result.to_email, campaign.name, sent_at)
+        stats.sent += 1
+        MESSAGES.labels(campaign.name, "sent").inc()
+    else:
+        logging.error(f"❌ Failed to send email to {result.to_email}: {result.error}")
+        if suppressions is not None and is_permanent_failure(result.error, result.job.message.recipients):
+            suppressions.add(result.to_email, REASON_BOUNCE, str(result.error))
+            logging.warning(f"🚫 {result.to_email} suppressed for all future campaigns")
+        campaign.source.record(result.context, False)
+        stats.failed += 1
+        MESSAGES.labels(campaign.name, "failed").inc()
+
+
+def deliver(campaign, recipients, workers=DEFAULT_WORKERS, backend=BACKEND_THREADS, journal=None, index=None,
+            suppressions=None, stats=None):
+    """
+    Render and send recipients over parallel SMTP sessions, recording each outcome.
+    recipients may be a generator (streaming source): it is consumed batch by
+    batch, so sending starts before the source has been read to the end.
+    Counts go into stats (a new CampaignStats by default), which is returned.
+    """
+    stats = stats or CampaignStats()
+    engine = limiter = None
+    progress = tqdm(total=len(recipients) if isinstance(recipients, list) else None, desc="Sending emails")
+    try:
+        for batch in _batches(recipients):
+            stats.selected += len(batch)
+            jobs = [DeliveryJob(recipient.email, campaign.render(recipient), context=recipient) for recipient in batch]
+            if not jobs:
+                continue
+            if engine is None:
+                limiter = RateLimiter.for_server(settings.SMTP_SERVER, account=settings.EMAIL_ADDRESS)
+                engine = create_engine(backend, settings.get_smtp_pool(), workers=workers, limiter=limiter)
+            results = engine.run(jobs)
+            try:
+                for result in results:
+                    progress.update()
+                    record_result(campaign, result, stats, journal, index, suppressions)
+            finally:
+                # Interrupted (Ctrl-C, failed bookkeeping): the engine lets in-flight messages
+                # finish; record them as well, or the next run would send them again
+                results.close()
+                for result in engine.take_pending_results():
+                    progress.update()
+                    try:
+                        record_result(campaign, result, stats, journal, index, suppressions)
+                    except Exception as e:
+                        logging.error(f"Failed to record the delivery to {result.to_email}: {e}")
+            if engine.quota_exceeded:
+                stats.unsent = stats.selected - stats.sent - stats.failed
+                rest = " (and the rest of the export)" if not isinstance(recipients, list) else ""
+                logging.warning(
+                    f"🛑 Daily limit of {limiter.per_day} emails reached: "
+                    f"{stats.unsent} email(s){rest} left unsent for a later run"
+                )
+                break
+    finally:
+        progress.close()
+        if limiter is not None:
+            limiter.save()
+        if journal is not None:
+            journal.close()
+    return stats
+
+
+def send_test_messages(campaign, attachments_dir=None):
+    """Dry run: send the campaign's test messages one by one over the shared pool."""
+    _banner("🧪 DRY RUN MODE - Sending test emails")
+    stats = CampaignStats(len(campaign.test_recipients))
+    pool = settings.get_smtp_pool()
+    for recipient in campaign.test_recipients:
+        if attachments_dir:
+            recipient.attachments = personal_attachments(attachments_dir, recipient.email)
+        for line in campaign.describe(recipient):
+            logging.info(line)
+        try:
+            pool.send_message(campaign.render(recipient))
+            logging.info(f"✅ Test email sent to {recipient.email}")
+            stats.sent += 1
+        except Exception as e:
+            logging.error(f"❌ Failed to send test email to {recipient.email}: {e}")
+            stats.failed += 1
+        logging.info(f"{'─'*60}")
+    if stats.sent:
+        logging.info("\nPlease check the inbox to verify the format!")
+    return stats
+
+
+def preview(campaign, recipients, stats=None):
+    """Log every message that would be sent and record it as a preview."""
+    stats = stats or CampaignStats()
+    stats.selected = len(recipients)
+    for recipient in tqdm(recipients, desc="Previewing emails"):
+        for line in campaign.describe(recipient):
+            logging.info(line)
+        logging.info(f"{'─'*60}")
+        campaign.source.record(recipient, True, preview=True)
+        stats.sent += 1
+    return stats
+
+
+def run_campaign(campaign, mode=MODE_PRODUCTION, workers=DEFAULT_WORKERS, backend=BACKEND_THREADS,
+                 attachments_dir=None):
+    """
+    Run one campaign through the pipeline in the given mode and return its CampaignStats.
+    Addresses the delivery index (or, without one, the journal) lists as having
+    received the campaign are skipped on every run, so an interrupted run is
+    continued by simply starting it again.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+    if mode == MODE_DRY_RUN:
+        return send_test_messages(campaign, attachments_dir)
+
+    banners = {
+        MODE_SIMULATE: "🔍 SIMULATION MODE - Preview",
+        MODE_PREVIEW: "🧪 TEST MODE - No emails will be sent!",
+        MODE_PRODUCTION: "🚀 PRODUCTION MODE - Sending emails to all recipients",
+    }
+    _banner(banners[mode])
+
+    # Source
+    source = campaign.source
+    with _stage(campaign, "load"):
+        source.load()
+    # Only production records deliveries and bounces; the other modes just look addresses up
+    read_only = mode != MODE_PRODUCTION
+    index = _open_store(get_delivery_index, campaign.index_path, read_only)
+    suppressions = _open_store(get_suppression_list, campaign.suppression_path, read_only)
+    journal = None
+    if mode == MODE_PRODUCTION and campaign.journal_path:
+        journal = open_journal(campaign, index)
+    stats = CampaignStats()
+
+    # Filter / dedup (a streaming source filters lazily, while delivering)
+    with _stage(campaign, "plan"):
+        recipients = source.select()
+        if suppressions is not None:
+            recipients = skip_suppressed(suppressions, recipients, stats)
+        if index is not None and campaign.once_per_address:
+            recipients = skip_received(campaign, index, recipients, stats)
+        streaming = not isinstance(recipients, list)
+        if streaming and mode != MODE_PRODUCTION:
+            # Simulation and preview report on the whole selection
+            recipients = list(recipients)
+            streaming = False
+        if not streaming:
+            source.log_plan()
+    if mode == MODE_SIMULATE:
+        if campaign.report is not None:
+            campaign.report(recipients)
+        elif recipients:
+            logging.info("📧 Example email:")
+            for line in campaign.describe(recipients[0]):
+                logging.info(f"   {line}")
+        stats.selected = len(recipients)
+        return stats
+
+    if attachments_dir:
+        if streaming:
+            recipients = stream_personal_files(recipients, attachments_dir)
+        else:
+            attach_personal_files(recipients, attachments_dir)
+
+    # Render, deliver, record
+    try:
+        with _stage(campaign, "deliver"):
+            if mode == MODE_PREVIEW:
+                preview(campaign, recipients, stats)
+            else:
+                deliver(campaign, recipients, workers=workers, backend=backend, journal=journal, index=index,
+                        suppressions=suppressions, stats=stats)
+    finally:
+        if streaming:
+            # Only known once the source has been read to the end
+            source.log_plan()
+        source.finish()
+    stats.log(mode)
+    if journal is not None:
+        logging.info(f"📒 Delivery status appended to {journal.path}")
+    return stats
@@ -0,0 +1,133 @@
+"""
+Vectorized recipient planning for the Eventfrog Orders CSV campaigns.
+Turns the ticket rows of an export into a send plan (one entry per email
+address, with first name, Goldau priority and the rows it covers) in a
+single pass of pandas string ops and a groupby, instead of iterrows().
+Rows are grouped by normalised address (see campaign.addresses), so case,
+whitespace and provider aliases do not produce extra emails.
+"""
+
+import pandas as pd
+
+from campaign.addresses import normalized_emails
+
+EMAIL_COLUMN = "Email"
+FIRST_NAME_COLUMN = "First name"
+CATEGORY_COLUMN = "Category"
+
+
+def is_phone_number(value):
+    """True for values made only of digits, '+', '-', spaces and parentheses (SMS not supported)."""
+    text = str(value).strip()
+    return text.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit()
+
+
+def is_valid_email(email):
+    """Basic email validation for a single value (see valid_email_mask for whole columns)."""
+    if not email:
+        return False
+    # Convert to string if it's not already (handles phone numbers as integers)
+    email_str = str(email).strip()
+    if is_phone_number(email_str):
+        return False
+    return "@" in email_str and "." in email_str and len(email_str) > 5
+
+
+def valid_email_mask(emails):
+    """Vectorized is_valid_email(): non-empty, contains '@' and '.', longer than 5 chars."""
+    stripped = emails.astype("string").str.strip()
+    mask = stripped.str.contains("@", regex=False) & stripped.str.contains(".", regex=False) & (stripped.str.len() > 5)
+    return mask.fillna(False).astype(bool)
+
+
+def goldau_mask(categories):
+    """Vectorized is_goldau_ticket(): category mentions Goldau (case-insensitive)."""
+    return categories.astype("string").str.contains("goldau", case=False, regex=False).fillna(False).astype(bool)
+
+
+def sent_mask(values):
+    """Rows whose tracking column already holds a timestamp."""
+    return (values.astype("string").str.strip().fillna("") != "").astype(bool)
+
+
+class RecipientPlan:
+    """Send plan: one row per unique email address plus row statistics."""
+
+    def __init__(self, recipients, total_rows, valid_rows, already_sent_rows, goldau_rows):
+        # recipients: DataFrame indexed by normalised address with email, first_name, is_goldau, rows
+        self.recipients = recipients
+        self.total_rows = total_rows
+        self.valid_rows = valid_rows
+        self.already_sent_rows = already_sent_rows
+        self.goldau_rows = goldau_rows
+
+    def __len__(self):
+        return len(self.recipients)
+
+    @property
+    def candidate_rows(self):
+        """Rows with a valid email that still need an email."""
+        return self.valid_rows - self.already_sent_rows
+
+    @property
+    def duplicate_rows(self):
+        """Rows covered by another row's email (skipped by deduplication)."""
+        return self.candidate_rows - len(self.recipients)
+
+    @property
+    def gersau_rows(self):
+        return self.candidate_rows - self.goldau_rows
+
+    @property
+    def duplicate_emails(self):
+        """Number of email addresses that appear on more than one row."""
+        return int((self.recipients["rows"].str.len() > 1).sum())
+
+    def items(self):
+        """Yield (email, first_name, is_goldau, row_indices) per recipient."""
+        for email, first_name, is_goldau, rows in zip(
+            self.recipients["email"], self.recipients["first_name"],
+            self.recipients["is_goldau"], self.recipients["rows"]
+        ):
+            yield email, first_name, bool(is_goldau), rows
+
+
+def plan_recipients(df, sent_column=None, email_column=EMAIL_COLUMN,
+                    name_column=FIRST_NAME_COLUMN, category_column=CATEGORY_COLUMN):
+    """
+    Build the send plan for df in one pass.
+    Rows with an invalid email or a filled sent_column are dropped; the rest
+    are grouped by normalised address (the first spelling is the one mailed),
+    any Goldau ticket gives the Goldau version and the first non-empty first
+    name is used for the greeting.
+    """
+    valid = valid_email_mask(df[email_column])
+    already_sent = valid & sent_mask(df[sent_column]) if sent_column and sent_column in df else valid & False
+    candidates = df.loc[valid & ~already_sent]
+
+    if category_column in candidates:
+        goldau = goldau_mask(candidates[category_column])
+    else:
+        goldau = pd.Series(False, index=candidates.index)
+    names = candidates[name_column] if name_column in candidates else pd.Series("", index=candidates.index)
+    emails = candidates[email_column].astype("string").str.strip()
+    keys = normalized_emails(candidates[email_column])
+
+    grouped = candidates.groupby(keys, sort=False)
+    recipients = pd.DataFrame({
+        "email": emails.groupby(keys, sort=False).first(),
+        "first_name": names.groupby(keys, sort=False).first(),
+        "is_goldau": goldau.groupby(keys, sort=False).any(),
+    })
+    recipients["first_name"] = recipients["first_name"].fillna("")
+    row_labels = candidates.index
+    recipients["rows"] = [row_labels[positions].tolist() for positions in
+                          (grouped.indices[key] for key in recipients.index)]
+
+    return RecipientPlan(
+        recipients,
+        total_rows=len(df),
+        valid_rows=int(valid.sum()),
+        already_sent_rows=int(already_sent.sum()),
+        goldau_rows=int(goldau.sum()),
+    )
@@ -0,0 +1,232 @@
+"""
+Outbound mail throttling for the Rigibeats campaign scripts.
+A token bucket enforces messages/minute, a persisted counter enforces
+messages/day, and temporary SMTP rejections (421/450/451/452) slow the
+bucket down and pause sending for a while.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Conservative per-provider defaults (messages/minute, messages/day); check your plan
+PROVIDER_LIMITS = {
+    "gmail.com": (20, 2000),
+    "googlemail.com": (20, 2000),
+    "infomaniak.com": (30, 1500),
+    "infomaniak.ch": (30, 1500),
+}
+FALLBACK_LIMITS = (60, None)
+
+# Temporary SMTP replies that mean "slow down" rather than "this address is bad"
+THROTTLE_CODES = (421, 450, 451, 452)
+MAX_SEND_ATTEMPTS = 4
+INITIAL_BACKOFF = 30
+MAX_BACKOFF = 600
+# After this many successes in a row, speed back up towards the configured rate
+RECOVERY_AFTER = 20
+
+STATE_FILE = os.path.join(".cache", "smtp_rate_state.json")
+
+
+class DailyQuotaExceeded(Exception):
+    """Raised when the messages/day budget for the account is used up."""
+
+
+def smtp_error_code(error):
+    """Extract the SMTP reply code from an smtplib/aiosmtplib exception, if any."""
+    code = getattr(error, "smtp_code", None) or getattr(error, "code", None)
+    if code:
+        return code
+    recipients = getattr(error, "recipients", None)
+    if isinstance(recipients, dict):
+        # smtplib.SMTPRecipientsRefused: {address: (code, message)}
+        for value in recipients.values():
+            return value[0]
+    elif recipients:
+        # aiosmtplib.SMTPRecipientsRefused: [SMTPRecipientRefused, ...]
+        return getattr(recipients[0], "code", None)
+    return None
+
+
+def is_throttle_error(error):
+    """True if the error is a temporary 'too many messages' style rejection."""
+    return smtp_error_code(error) in THROTTLE_CODES
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() returns how long the caller must wait."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate_per_minute):
+        with self._lock:
+            self._refill()
+            self.rate = rate_per_minute / 60.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take one token, returning the delay in seconds until it is actually available."""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Per-minute token bucket plus a per-day budget with adaptive backoff."""
+
+    def __init__(self, per_minute, per_day=None, account="", state_file=STATE_FILE):
+        self.per_minute = per_minute
+        self.current_per_minute = per_minute
+        self.per_day = per_day
+        self.account = account
+        self.state_file = state_file
+        self.bucket = TokenBucket(per_minute)
+        self.paused_until = 0.0
+        self.backoff_delay = INITIAL_BACKOFF
+        self.success_streak = 0
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self.day = date.today().isoformat()
+        self.sent_today = self._load_sent_today()
+
+    @classmethod
+    def for_server(cls, server, account=""):
+        """Build a limiter from provider defaults, overridable via SMTP_RATE_PER_MINUTE / SMTP_RATE_PER_DAY."""
+        per_minute, per_day = FALLBACK_LIMITS
+        host = (server or "").lower()
+        for domain, limits in PROVIDER_LIMITS.items():
+            if host == domain or host.endswith("." + domain):
+                per_minute, per_day = limits
+                break
+        per_minute = float(os.getenv("SMTP_RATE_PER_MINUTE") or per_minute)
+        per_day_env = os.getenv("SMTP_RATE_PER_DAY")
+        if per_day_env:
+            per_day = int(per_day_env) or None
+        return cls(per_minute, per_day, account=account)
+
+    def _load_sent_today(self):
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f).get(self.account, {})
+        except (OSError, ValueError):
+            return 0
+        return state.get("sent", 0) if state.get("day") == self.day else 0
+
+    def save(self):
+        """Persist today's message count so later runs respect the daily budget (call when delivery ends)."""
+        try:
+            try:
+                with open(self.state_file, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            state[self.account] = {"day": self.day, "sent": self.sent_today}
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            tmp_file = self.state_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logging.warning(f"Could not save SMTP rate state: {e}")
+
+    def remaining_today(self):
+        """Messages left in today's budget (None if unlimited)."""
+        if self.per_day is None:
+            return None
+        return max(0, self.per_day - self.sent_today)
+
+    def reserve(self):
+        """
+        Claim a send slot; returns seconds to wait before sending. Raises DailyQuotaExceeded.
+        The slot counts against today's budget until release() gives it back.
+        """
+        with self._lock:
+            today = date.today().isoformat()
+            if today != self.day:
+                self.day, self.sent_today = today, 0
+            if self.per_day is not None and self.sent_today >= self.per_day:
+                raise DailyQuotaExceeded(f"Daily limit of {self.per_day} messages reached")
+            self.sent_today += 1
+            now = time.monotonic()
+            if now - self._last_save > 5:
+                self._last_save = now
+                self.save()
+            pause = max(0.0, self.paused_until - now)
+        return max(pause, self.bucket.reserve())
+
+    def release(self):
+        """Give back the slot of a message the server did not accept."""
+        with self._lock:
+            self.sent_today = max(0, self.sent_today - 1)
+
+    def wait(self):
+        """Block until the next message may be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_success(self):
+        """Speed back up after a streak of accepted messages."""
+        with self._lock:
+            self.success_streak += 1
+            if self.success_streak < RECOVERY_AFTER or self.current_per_minute >= self.per_minute:
+                return
+            self.success_streak = 0
+            self.backoff_delay = INITIAL_BACKOFF
+            self.current_per_minute = min(self.per_minute, self.current_per_minute * 1.25)
+        self.bucket.set_rate(self.current_per_minute)
+        logging.info(f"📈 Send rate recovered to {self.current_per_minute:.1f}/min")
+
+    def record_throttle(self, error):
+        """Halve the send rate and pause everyone after a 421/450/451/452 reply."""
+        with self._lock:
+            self.success_streak = 0
+            # The rejected message did not count against the provider's daily cap
+            self.sent_today = max(0, self.sent_today - 1)
+            self.current_per_minute = max(1.0, self.current_per_minute / 2)
+            delay = self.backoff_delay
+            self.backoff_delay = min(MAX_BACKOFF, self.backoff_delay * 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.bucket.set_rate(self.current_per_minute)
+        logging.warning(
+            f"⏳ Server throttled us ({smtp_error_code(error)}): pausing {delay}s, "
+            f"rate lowered to {self.current_per_minute:.1f}/min"
+        )
+
+    def projected_duration(self, count):
+        """Seconds needed to send count messages at the current rate (None if over today's budget)."""
+        remaining = self.remaining_today()
+        if remaining is not None and count > remaining:
+            return None
+        return count / self.current_per_minute * 60
+
+    def log_projection(self, count):
+        """Log the projected completion time for a campaign of count messages."""
+        remaining = self.remaining_today()
+        budget = "unlimited" if remaining is None else f"{remaining} left today"
+        logging.info(f"🚦 Rate limit: {self.current_per_minute:.0f}/min, daily budget {budget}")
+        seconds = self.projected_duration(count)
+        if seconds is None:
+            logging.warning(
+                f"⚠️  Only {remaining} of {count} emails fit into today's budget; "
+                "the rest will be left unsent for a later run"
+            )
+            seconds = remaining / self.current_per_minute * 60
+        eta = datetime.now() + timedelta(seconds=seconds)
+        logging.info(f"⏱️  Projected completion: ~{seconds / 60:.1f} min (around {eta.strftime('%H:%M')})")
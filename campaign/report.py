@@ -0,0 +1,81 @@
+"""
+Tracking reports for the Orders CSV campaigns.
+Production runs only append to the delivery journal; the tracking copy of
+the export (every delivered row stamped in the sent column) is built on
+demand afterwards. The export is read in chunks and written row by row,
+the Excel copy with openpyxl's write-only mode, so memory stays flat
+however large the export is.
+"""
+
+import logging
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+
+from campaign.addresses import normalize_email, normalized_emails
+from campaign.journal import SendJournal
+from campaign.planning import EMAIL_COLUMN, sent_mask
+
+REPORT_CHUNK_ROWS = 5000
+
+
+def stamp_sent(df, sent, sent_column):
+    """Fill sent_column with sent[email] on rows that are not stamped yet (matched by normalised address)."""
+    if sent_column not in df.columns:
+        df[sent_column] = ''
+    sent_at = normalized_emails(df[EMAIL_COLUMN]).map(sent)
+    delivered = sent_at.notna() & ~sent_mask(df[sent_column])
+    df[sent_column] = df[sent_column].astype(object)
+    df.loc[delivered, sent_column] = sent_at[delivered]
+    return df
+
+
+def _cell(value):
+    return None if pd.isna(value) else value
+
+
+def write_report(csv_path, sent, sent_column, output_file, excel=True, chunk_size=REPORT_CHUNK_ROWS):
+    """
+    Write csv_path with sent ({normalised address: sent_at}) stamped in as
+    <output_file>_<timestamp>.csv and, with excel, an .xlsx copy.
+    Returns the paths written.
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H%M')
+    output_csv = output_file.replace('.csv', f'_{timestamp}.csv')
+    outputs = [output_csv]
+    workbook = sheet = None
+    if excel:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+
+    first = True
+    for chunk in pd.read_csv(csv_path, encoding='utf-8-sig', chunksize=chunk_size):
+        chunk = stamp_sent(chunk, sent, sent_column)
+        chunk.to_csv(output_csv, mode='w' if first else 'a', header=first, index=False,
+                     encoding='utf-8-sig' if first else 'utf-8')
+        if sheet is not None:
+            if first:
+                sheet.append(list(chunk.columns))
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.append([_cell(value) for value in row])
+        first = False
+
+    if workbook is not None:
+        output_excel = output_csv.replace('.csv', '.xlsx')
+        workbook.save(output_excel)
+        outputs.append(output_excel)
+    return outputs
+
+
+def campaign_report(campaign, output_file, excel=True):
+    """Tracking report of a CSV campaign from its delivery journal; returns the paths written."""
+    source = campaign.source
+    journaled = SendJournal(campaign.journal_path).load_sent()
+    logging.info(f"📒 {len(journaled)} deliveries in {campaign.journal_path}")
+    sent = {normalize_email(email): sent_at for email, sent_at in journaled.items()}
+    outputs = write_report(source.path, sent, source.sent_column, output_file, excel=excel)
+    logging.info(f"💾 Report saved to:")
+    for path in outputs:
+        logging.info(f"   - {path}")
+    return outputs
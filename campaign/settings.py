@@ -0,0 +1,42 @@
+"""
+Environment-backed settings shared by every campaign script.
+Loads .env once, configures logging and exposes the SMTP account the
+campaigns send from.
+"""
+
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from campaign.smtp_pool import get_pool
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# SMTP Configuration
+SMTP_SERVER = os.getenv("SMTP_SERVER")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+EMAIL_ADDRESS = os.getenv("SMTP_ACCOUNT")
+EMAIL_PASSWORD = os.getenv("SMTP_PASSWORD")
+# SMTP_STARTTLS=0 talks plain SMTP (local sink only); SMTP_CA_FILE trusts an
+# extra certificate, e.g. the one smtp_sink.py generates
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_CA_FILE = os.getenv("SMTP_CA_FILE")
+
+# Every campaign mail is copied here
+BCC_ADDRESS = "hi@rigibeats.ch"
+
+
+def get_smtp_pool():
+    """Return the shared SMTP connection pool for the configured account."""
+    return get_pool(SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD,
+                    starttls=SMTP_STARTTLS, ca_file=SMTP_CA_FILE)
+
+
+def smtp_configured():
+    """True when server, account and password are all set."""
+    return all([SMTP_SERVER, EMAIL_ADDRESS, EMAIL_PASSWORD])
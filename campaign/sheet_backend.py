@@ -0,0 +1,80 @@
+"""
+Pluggable worksheet backends for the sheet-driven scripts.
+A backend is any object with the subset of gspread's Worksheet the
+campaigns use:
+  get_all_values(), row_values(row), col_values(col)           reads
+  update_cell(row, col, value), update(values, range_name, raw)
+  batch_update(data, raw), format(range, format), batch_format(formats)
+  spreadsheet_id, id, spreadsheet.get_lastUpdateTime()         snapshot cache
+SHEET_BACKEND selects it: "gspread" (default) opens the real sheet with
+the service account, "fake" serves an in-memory FakeWorksheet for offline
+runs and benchmarks. Either way the worksheet is wrapped in the quota
+scheduler.
+"""
+
+import atexit
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from campaign.sheet_scheduler import ScheduledWorksheet
+
+load_dotenv()
+
+BACKEND_GSPREAD = "gspread"
+BACKEND_FAKE = "fake"
+SHEET_BACKENDS = (BACKEND_GSPREAD, BACKEND_FAKE)
+
+SHEET_BACKEND = os.getenv("SHEET_BACKEND", BACKEND_GSPREAD)
+
+# Fake backend: CSV with the initial grid (written back on exit), simulated
+# round-trip seconds and per-minute quotas (empty = unlimited)
+FAKE_SHEET_FILE = os.getenv("FAKE_SHEET_FILE")
+FAKE_SHEET_LATENCY = float(os.getenv("FAKE_SHEET_LATENCY", "0"))
+FAKE_SHEET_READS_PER_MINUTE = int(os.getenv("FAKE_SHEET_READS_PER_MINUTE") or 0) or None
+FAKE_SHEET_WRITES_PER_MINUTE = int(os.getenv("FAKE_SHEET_WRITES_PER_MINUTE") or 0) or None
+
+
+def open_gspread_worksheet(spreadsheet_id, credentials_file):
+    """The first worksheet of a real spreadsheet, opened with service account credentials."""
+    import gspread
+    from google.oauth2.service_account import Credentials as ServiceAccountCredentials
+
+    scopes = [
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    credentials = ServiceAccountCredentials.from_service_account_file(
+        credentials_file, scopes=scopes
+    )
+    client = gspread.authorize(credentials)
+    return client.open_by_key(spreadsheet_id).sheet1
+
+
+def open_fake_worksheet(path=FAKE_SHEET_FILE):
+    """A FakeWorksheet seeded from path (if given) that writes its grid back there on exit."""
+    from campaign.fake_sheet import FakeWorksheet
+
+    options = dict(
+        latency=FAKE_SHEET_LATENCY,
+        reads_per_minute=FAKE_SHEET_READS_PER_MINUTE,
+        writes_per_minute=FAKE_SHEET_WRITES_PER_MINUTE,
+    )
+    if not path:
+        return FakeWorksheet(**options)
+    sheet = FakeWorksheet.from_csv(path, **options) if os.path.exists(path) else FakeWorksheet(**options)
+    atexit.register(sheet.save, path)
+    logging.info(f"🧪 Using the fake sheet backend ({len(sheet.rows)} rows from {path})")
+    return sheet
+
+
+def open_worksheet(spreadsheet_id=None, credentials_file=None, backend=SHEET_BACKEND):
+    """Open the campaign worksheet with the selected backend, behind the quota scheduler."""
+    if backend == BACKEND_FAKE:
+        sheet = open_fake_worksheet()
+    elif backend == BACKEND_GSPREAD:
+        sheet = open_gspread_worksheet(spreadsheet_id, credentials_file)
+    else:
+        raise ValueError(f"Unknown SHEET_BACKEND {backend!r}, expected one of {', '.join(SHEET_BACKENDS)}")
+    return ScheduledWorksheet(sheet)
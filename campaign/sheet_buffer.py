@@ -0,0 +1,125 @@
+"""
+Write buffer for Google Sheets bookkeeping.
+Collects cell and range updates and background colours during a send
+loop and flushes them as one batch_update + one batch_format call every N
+writes or T seconds, instead of two API round-trips per row.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from gspread.utils import rowcol_to_a1
+
+from campaign.metrics import SHEET_PENDING_WRITES
+
+DEFAULT_FLUSH_EVERY = int(os.getenv("SHEET_FLUSH_EVERY", "50"))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("SHEET_FLUSH_INTERVAL", "10"))
+
+
+class SheetWriteError(Exception):
+    """Raised by close() when queued writes could not be written to the sheet."""
+
+
+class SheetWriteBuffer:
+    """Buffers update_cell()/update()/format() calls and writes them in batches."""
+
+    def __init__(self, sheet, flush_every=DEFAULT_FLUSH_EVERY, flush_interval=DEFAULT_FLUSH_INTERVAL, snapshot=None):
+        self.sheet = sheet
+        # SheetSnapshot of the values the run read, told about every write (optional)
+        self.snapshot = snapshot
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.values = {}
+        self.formats = []
+        self.last_flush = time.monotonic()
+        self.last_error = None
+        self._lock = threading.RLock()
+        atexit.register(self.flush)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Flush on normal exit and on crashes, so already-sent rows get recorded
+        try:
+            self.close()
+        except SheetWriteError:
+            # Already logged; don't hide the exception that ended the with-block
+            if exc_type is None:
+                raise
+        return False
+
+    def __len__(self):
+        return len(self.values) + len(self.formats)
+
+    def update_cell(self, row, col, value):
+        """Queue a single cell value (same signature as Worksheet.update_cell)."""
+        with self._lock:
+            self.values[rowcol_to_a1(row, col)] = [[value]]
+        self._maybe_flush()
+
+    def update(self, values, range_name):
+        """Queue a block of values for range_name (as Worksheet.update with raw=False)."""
+        with self._lock:
+            self.values[range_name] = values
+        self._maybe_flush()
+
+    def format(self, range_name, cell_format):
+        """Queue a cell format (same signature as Worksheet.format)."""
+        with self._lock:
+            self.formats.append({"range": range_name, "format": cell_format})
+        self._maybe_flush()
+
+    def close(self):
+        """
+        Flush what is left and stop the interpreter-exit flush. Raises
+        SheetWriteError if writes are still pending; the exit-time flush
+        then stays registered and tries once more.
+        """
+        self.flush()
+        if len(self):
+            raise SheetWriteError(
+                f"{len(self)} pending write(s) could not be written to the sheet: {self.last_error}"
+            ) from self.last_error
+        atexit.unregister(self.flush)
+
+    def _maybe_flush(self):
+        SHEET_PENDING_WRITES.set(len(self))
+        if len(self) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending values and formats; failed writes stay queued for
+        the next flush (or close(), which raises if they still fail).
+        """
+        with self._lock:
+            self.last_flush = time.monotonic()
+            if self.values:
+                data = [{"range": a1, "values": values} for a1, values in self.values.items()]
+                if self.snapshot is not None:
+                    self.snapshot.discard()
+                try:
+                    self.sheet.batch_update(data, raw=False)
+                    self.values = {}
+                except Exception as e:
+                    self.last_error = e
+                    logging.error(f"Failed to write {len(data)} range(s) to the sheet: {e}")
+                    logging.error(f"Pending cells: {', '.join(self.values)}")
+            if self.formats:
+                if self.snapshot is not None:
+                    self.snapshot.before_format()
+                try:
+                    self.sheet.batch_format(self.formats)
+                    self.formats = []
+                    if self.snapshot is not None:
+                        self.snapshot.formatted()
+                except Exception as e:
+                    if self.snapshot is not None:
+                        self.snapshot.discard()
+                    self.last_error = e
+                    logging.error(f"Failed to format {len(self.formats)} cell(s) in the sheet: {e}")
+            SHEET_PENDING_WRITES.set(len(self))
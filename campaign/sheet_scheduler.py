@@ -0,0 +1,162 @@
+"""
+Quota-aware scheduling of Google Sheets API requests.
+ScheduledWorksheet wraps a gspread Worksheet: every read and write waits
+for a token from the per-minute read/write budget (callers queue up in the
+token bucket instead of tripping the quota), 429 and 5xx replies are
+retried with jittered exponential backoff, and batch_update/batch_format
+payloads are split into request-sized pieces. Writes are coalesced in
+front of it by SheetWriteBuffer.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+from gspread.exceptions import APIError
+
+from campaign.metrics import SHEET_QUOTA_WAIT_SECONDS, SHEET_REQUEST_SECONDS, SHEET_RETRIES
+from campaign.rate_limit import TokenBucket
+
+# Sheets API default quota: 60 read and 60 write requests per minute per user
+READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+
+RETRY_CODES = (429, 500, 502, 503, 504)
+MAX_ATTEMPTS = 8
+INITIAL_BACKOFF = 1.0
+MAX_BACKOFF = 64.0
+
+# Keep single requests well below the API's payload limits
+MAX_CELLS_PER_REQUEST = 50000
+MAX_FORMATS_PER_REQUEST = 1000
+
+READ_METHODS = {
+    "acell", "batch_get", "cell", "col_values", "find", "findall", "get", "get_all_records",
+    "get_all_values", "get_values", "row_values",
+}
+WRITE_METHODS = {
+    "add_cols", "add_rows", "append_row", "append_rows", "batch_clear", "batch_format",
+    "batch_update", "clear", "format", "resize", "update", "update_acell", "update_cell",
+    "update_cells",
+}
+
+
+def is_retryable(error):
+    """True for rate-limit (429) and server-side (5xx) API errors and dropped connections."""
+    if isinstance(error, APIError):
+        return error.code in RETRY_CODES
+    # requests' connection errors and timeouts are OSErrors
+    return isinstance(error, OSError)
+
+
+def backoff_delay(attempt, initial=INITIAL_BACKOFF, maximum=MAX_BACKOFF):
+    """Truncated exponential backoff plus up to a second of random jitter."""
+    return min(maximum, initial * 2 ** (attempt - 1)) + random.uniform(0, 1)
+
+
+class SheetQuota:
+    """Per-minute read and write budgets shared by every worksheet of the account."""
+
+    def __init__(self, reads_per_minute=READS_PER_MINUTE, writes_per_minute=WRITES_PER_MINUTE):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute),
+            "write": TokenBucket(writes_per_minute),
+        }
+
+    def wait(self, kind):
+        """Block until a request of kind ('read' or 'write') fits the budget."""
+        delay = self.buckets[kind].reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_quota = None
+_quota_lock = threading.Lock()
+
+
+def get_sheet_quota():
+    """Return the process-wide SheetQuota."""
+    global _quota
+    with _quota_lock:
+        if _quota is None:
+            _quota = SheetQuota()
+        return _quota
+
+
+def _cell_count(entry):
+    return max(1, sum(len(row) for row in entry.get("values", [])))
+
+
+def _split(items, limit, size=lambda item: 1):
+    """Split items into consecutive lists whose total size stays within limit."""
+    batch, total = [], 0
+    for item in items:
+        item_size = size(item)
+        if batch and total + item_size > limit:
+            yield batch
+            batch, total = [], 0
+        batch.append(item)
+        total += item_size
+    if batch:
+        yield batch
+
+
+class ScheduledWorksheet:
+    """A gspread Worksheet whose API calls respect the quota and survive 429/5xx replies."""
+
+    def __init__(self, worksheet, quota=None, max_attempts=MAX_ATTEMPTS):
+        self.worksheet = worksheet
+        self.quota = quota or get_sheet_quota()
+        self.max_attempts = max_attempts
+        self.requests = {"read": 0, "write": 0}
+        self.retries = 0
+
+    def call(self, kind, method, *args, **kwargs):
+        """Run one API request of kind, waiting for quota and retrying transient errors."""
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            self.quota.wait(kind)
+            SHEET_QUOTA_WAIT_SECONDS.labels(kind).inc(time.perf_counter() - started)
+            self.requests[kind] += 1
+            try:
+                with SHEET_REQUEST_SECONDS.labels(kind).time():
+                    return method(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts:
+                    raise
+                delay = backoff_delay(attempt)
+                self.retries += 1
+                SHEET_RETRIES.labels(kind).inc()
+                logging.warning(f"Sheets API {kind} failed ({e}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def batch_update(self, data, raw=True, **kwargs):
+        """Worksheet.batch_update, split into requests of at most MAX_CELLS_PER_REQUEST cells."""
+        responses = [
+            self.call("write", self.worksheet.batch_update, batch, raw=raw, **kwargs)
+            for batch in _split(list(data), MAX_CELLS_PER_REQUEST, _cell_count)
+        ]
+        return responses[-1] if len(responses) == 1 else responses
+
+    def batch_format(self, formats):
+        """Worksheet.batch_format, split into requests of at most MAX_FORMATS_PER_REQUEST ranges."""
+        responses = [
+            self.call("write", self.worksheet.batch_format, batch)
+            for batch in _split(list(formats), MAX_FORMATS_PER_REQUEST)
+        ]
+        return responses[-1] if len(responses) == 1 else responses
+
+    def __getattr__(self, name):
+        attribute = getattr(self.worksheet, name)
+        if name in READ_METHODS:
+            kind = "read"
+        elif name in WRITE_METHODS:
+            kind = "write"
+        else:
+            return attribute
+
+        def scheduled(*args, **kwargs):
+            return self.call(kind, attribute, *args, **kwargs)
+        return scheduled
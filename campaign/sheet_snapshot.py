@@ -0,0 +1,108 @@
+"""
+On-disk snapshot of Google Sheet contents.
+Snapshots are keyed by spreadsheet and worksheet ID and tagged with the
+Drive modifiedTime; a repeat run only downloads the sheet again when the
+spreadsheet changed since the snapshot was taken. Formatting changes the
+modifiedTime too, so a run that only coloured cells (--test) re-tags its
+snapshot afterwards (see SheetSnapshot).
+"""
+
+import json
+import logging
+import os
+
+SNAPSHOT_DIR = os.path.join(".cache", "sheets")
+
+
+def get_revision(sheet):
+    """Return the spreadsheet's Drive modifiedTime (None if it cannot be read)."""
+    try:
+        return sheet.spreadsheet.get_lastUpdateTime()
+    except Exception as e:
+        logging.warning(f"Could not read sheet revision, snapshot cache disabled: {e}")
+        return None
+
+
+def snapshot_path(sheet, cache_dir=SNAPSHOT_DIR):
+    return os.path.join(cache_dir, f"{sheet.spreadsheet_id}_{sheet.id}.json")
+
+
+def _save(path, revision, values):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"revision": revision, "values": values}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not save sheet snapshot: {e}")
+
+
+class SheetSnapshot:
+    """
+    The values a run read and the revision they belong to.
+    The run's own formatting changes the revision but not the values:
+    formatted() follows it, and save() re-tags the snapshot so the next run
+    can still reuse it. Writing values, a failed write or a change by
+    someone else (checked in before_format()) gives that up; the next run
+    then downloads the sheet again.
+    """
+
+    def __init__(self, sheet, values, revision, cache_dir=SNAPSHOT_DIR):
+        self.sheet = sheet
+        self.values = values
+        self.revision = revision
+        self.cache_dir = cache_dir
+        self.current = revision is not None
+        self.retagged = False
+
+    def before_format(self):
+        """Check that nobody else changed the sheet since the last known revision."""
+        if self.current and get_revision(self.sheet) != self.revision:
+            self.current = False
+
+    def formatted(self):
+        """The run's own formatting went through; follow the revision it created."""
+        if self.current:
+            self.revision = get_revision(self.sheet)
+            self.current = self.revision is not None
+            self.retagged = True
+
+    def discard(self):
+        """The sheet's values were (or may have been) changed by this run."""
+        self.current = False
+
+    def save(self):
+        """Re-tag the on-disk snapshot if only this run's formatting changed the sheet."""
+        if self.current and self.retagged:
+            _save(snapshot_path(self.sheet, self.cache_dir), self.revision, self.values)
+
+
+def load_sheet_values(sheet, use_cache=True, cache_dir=SNAPSHOT_DIR):
+    """Return sheet.get_all_values(), reusing the local snapshot if nothing changed."""
+    return read_sheet(sheet, use_cache, cache_dir).values
+
+
+def read_sheet(sheet, use_cache=True, cache_dir=SNAPSHOT_DIR):
+    """load_sheet_values() as a SheetSnapshot (without use_cache it is never saved)."""
+    if not use_cache:
+        return SheetSnapshot(sheet, sheet.get_all_values(), None, cache_dir)
+
+    # Read the revision before the values: if the sheet changes in between,
+    # the snapshot is tagged with the older revision and refreshed next time
+    revision = get_revision(sheet)
+    path = snapshot_path(sheet, cache_dir)
+    if revision:
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("revision") == revision:
+                logging.info(f"📦 Sheet unchanged since {revision}, using local snapshot ({len(snapshot['values'])} rows)")
+                return SheetSnapshot(sheet, snapshot["values"], revision, cache_dir)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    values = sheet.get_all_values()
+    if revision:
+        _save(path, revision, values)
+    return SheetSnapshot(sheet, values, revision, cache_dir)
@@ -0,0 +1,62 @@
+"""
+Columnar view over raw Google Sheet values.
+Holds the get_all_values() rows as-is plus a header -> index map and hands
+out lightweight per-row views that only resolve the columns a loop asks for,
+instead of building a dict with every header for every row.
+"""
+
+
+class SheetRecord:
+    """Read-only view of one sheet row, restricted to a set of columns."""
+
+    __slots__ = ("row_number", "_row", "_index")
+
+    def __init__(self, row_number, row, index):
+        self.row_number = row_number
+        self._row = row
+        self._index = index
+
+    def get(self, column, default=""):
+        """Value of column in this row (default if the column or cell is missing)."""
+        i = self._index.get(column)
+        if i is None or i >= len(self._row):
+            return default
+        return self._row[i]
+
+    def __getitem__(self, column):
+        if column not in self._index:
+            raise KeyError(column)
+        return self.get(column)
+
+
+class SheetTable:
+    """Header row, data rows and a header -> column index map for a worksheet."""
+
+    def __init__(self, values):
+        self.headers = list(values[0]) if values else []
+        self.rows = values[1:]
+        self.index = {}
+        for i, header in enumerate(self.headers):
+            # Empty headers are ignored; for duplicates the first column wins
+            if header and header not in self.index:
+                self.index[header] = i
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column_indices(self, column):
+        """All 0-based positions of columns named column."""
+        return [i for i, header in enumerate(self.headers) if header == column]
+
+    def column(self, column, default=""):
+        """All values of one column (data rows only)."""
+        i = self.index.get(column)
+        if i is None:
+            return [default] * len(self.rows)
+        return [row[i] if i < len(row) else default for row in self.rows]
+
+    def records(self, *columns):
+        """Yield a SheetRecord per data row (row_number is the 1-based sheet row)."""
+        index = {column: self.index[column] for column in columns if column in self.index} if columns else self.index
+        for row_number, row in enumerate(self.rows, start=2):
+            yield SheetRecord(row_number, row, index)
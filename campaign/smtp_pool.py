@@ -0,0 +1,251 @@
+"""
+Reusable SMTP sessions for the Rigibeats mail scripts.
+Keeps authenticated connections alive across messages instead of doing
+connect / STARTTLS / login for every single recipient.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import ssl
+import threading
+from contextlib import contextmanager
+
+from campaign.metrics import SMTP_RETRIES, SMTP_SECONDS
+from campaign.templates import OutgoingMessage
+
+# Recycle a session after this many messages (servers tend to drop long-lived sessions)
+DEFAULT_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", "100"))
+DEFAULT_TIMEOUT = 30
+
+
+def dot_stuffed(chunks):
+    """
+    Turn message chunks into the DATA payload: double leading periods
+    (RFC 5321 4.5.2) across chunk boundaries and append the terminator.
+    """
+    at_line_start = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if at_line_start and chunk.startswith(b"."):
+            chunk = b"." + chunk
+        chunk = chunk.replace(b"\r\n.", b"\r\n..")
+        at_line_start = chunk.endswith(b"\r\n")
+        yield chunk
+    yield b".\r\n" if at_line_start else b"\r\n.\r\n"
+
+
+def send_streamed(smtp, msg):
+    """
+    sendmail() for an OutgoingMessage whose attachments are streamed: the
+    DATA payload is written chunk by chunk instead of being built in memory.
+    """
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(msg.sender)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, msg.sender)
+    refused = {}
+    for recipient in msg.recipients:
+        code, resp = smtp.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, resp)
+    if len(refused) == len(msg.recipients):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    smtp.putcmd("data")
+    code, resp = smtp.getreply()
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    for chunk in dot_stuffed(msg.chunks()):
+        smtp.send(chunk)
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+def deliver(smtp, msg):
+    """
+    Send an email Message or a pre-rendered OutgoingMessage over an open connection.
+    An OutgoingMessage whose first (To) recipient is refused raises
+    SMTPRecipientsRefused even when the BCC copy was accepted.
+    """
+    if isinstance(msg, OutgoingMessage):
+        if msg.streamed:
+            refused = send_streamed(smtp, msg)
+        else:
+            refused = smtp.sendmail(msg.sender, msg.recipients, msg.data)
+        to_email = msg.recipients[0]
+        if to_email in refused:
+            raise smtplib.SMTPRecipientsRefused({to_email: refused[to_email]})
+        return refused
+    return smtp.send_message(msg)
+
+
+def tls_context(ca_file=None):
+    """SSL context for STARTTLS; ca_file adds trust in e.g. a local sink's self-signed certificate."""
+    return ssl.create_default_context(cafile=ca_file) if ca_file else None
+
+
+class SMTPSession:
+    """A single authenticated SMTP connection that reconnects on demand."""
+
+    def __init__(self, server, port, username, password,
+                 max_messages=DEFAULT_MAX_MESSAGES_PER_SESSION, timeout=DEFAULT_TIMEOUT,
+                 starttls=True, ca_file=None):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.starttls = starttls
+        self.ca_file = ca_file
+        self.smtp = None
+        self.sent_count = 0
+
+    def connect(self):
+        """Open the connection, upgrade to TLS and log in."""
+        self.close()
+        with SMTP_SECONDS.labels("connect").time():
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                with SMTP_SECONDS.labels("starttls").time():
+                    smtp.starttls(context=tls_context(self.ca_file))
+            with SMTP_SECONDS.labels("auth").time():
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.sent_count = 0
+        logging.debug(f"SMTP session opened to {self.server}:{self.port}")
+
+    def close(self):
+        """Close the connection (ignoring errors from an already dead socket)."""
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+        self.smtp = None
+
+    def send_message(self, msg):
+        """Send a message, reconnecting once if the server dropped the session."""
+        if self.smtp is None or self.sent_count >= self.max_messages:
+            self.connect()
+        try:
+            with SMTP_SECONDS.labels("data").time():
+                result = deliver(self.smtp, msg)
+        except smtplib.SMTPServerDisconnected:
+            logging.info("SMTP server disconnected, reconnecting...")
+            SMTP_RETRIES.labels("disconnect").inc()
+            self.connect()
+            with SMTP_SECONDS.labels("data").time():
+                result = deliver(self.smtp, msg)
+        self.sent_count += 1
+        return result
+
+
+class SMTPPool:
+    """Thread-safe pool of SMTPSession objects sharing one set of credentials."""
+
+    def __init__(self, server, port, username, password, size=1,
+                 max_messages_per_session=DEFAULT_MAX_MESSAGES_PER_SESSION, timeout=DEFAULT_TIMEOUT,
+                 starttls=True, ca_file=None):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_messages_per_session = max_messages_per_session
+        self.timeout = timeout
+        self.starttls = starttls
+        self.ca_file = ca_file
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._sessions = []
+
+    def _new_session(self):
+        session = SMTPSession(
+            self.server, self.port, self.username, self.password,
+            max_messages=self.max_messages_per_session, timeout=self.timeout,
+            starttls=self.starttls, ca_file=self.ca_file
+        )
+        self._sessions.append(session)
+        return session
+
+    def acquire(self):
+        """Take an idle session, creating one if the pool is not full yet."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._new_session()
+        return self._idle.get()
+
+    def release(self, session):
+        """Hand a session back to the pool."""
+        self._idle.put(session)
+
+    def resize(self, size):
+        """Allow more sessions to be opened (e.g. one per worker thread)."""
+        with self._lock:
+            self.size = max(self.size, size)
+
+    @contextmanager
+    def session(self):
+        """Borrow a session for the duration of a with-block."""
+        session = self.acquire()
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def send_message(self, msg):
+        """Send a single message over a pooled session."""
+        with self.session() as session:
+            return session.send_message(msg)
+
+    def close(self):
+        """Close all sessions opened by this pool."""
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(server, port, username, password, **kwargs):
+    """Return the shared pool for this server/account, creating it on first use."""
+    key = (server, port, username)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPPool(server, port, username, password, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """Close every shared pool (registered to run at interpreter exit)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+atexit.register(close_all_pools)
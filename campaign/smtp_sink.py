@@ -0,0 +1,402 @@
+"""
+Local SMTP sink for throughput tests.
+An asyncio SMTP server that accepts (and discards) whatever the campaign
+scripts send: EHLO, optional STARTTLS with a generated self-signed
+certificate, AUTH PLAIN/LOGIN with any credentials, MAIL/RCPT/DATA.
+Replies can be delayed per command to mimic a remote provider, and a
+share of them replaced by injected errors (e.g. 550 on RCPT, 451 after
+DATA, 421 on MAIL) to exercise bounce handling and backoff. The sink
+counts sessions, messages and bytes, so messages/second can be compared
+between transports and releases.
+
+Generating the certificate requires the optional 'cryptography' package
+(uv sync --extra sink); an existing certificate can be passed instead.
+"""
+
+import asyncio
+import base64
+import datetime
+import ipaddress
+import logging
+import os
+import random
+import ssl
+import threading
+import time
+from collections import Counter
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    x509 = None
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8025
+CERT_DIR = os.path.join(".cache", "smtp_sink")
+# Longest line accepted (base64 attachment lines are far shorter)
+LINE_LIMIT = 1 << 20
+
+# Commands whose latency and failures can be configured; CONNECT is the greeting
+COMMANDS = ("CONNECT", "EHLO", "STARTTLS", "AUTH", "MAIL", "RCPT", "DATA", "QUIT")
+
+REPLY_TEXT = {
+    421: "4.7.0 Try again later, closing connection",
+    450: "4.2.1 Mailbox temporarily unavailable",
+    451: "4.3.0 Temporary local problem",
+    452: "4.5.3 Too many recipients",
+    550: "5.1.1 Mailbox unavailable",
+    552: "5.3.4 Message size exceeds limit",
+    554: "5.7.1 Message rejected",
+}
+
+
+def generate_certificate(cert_dir=CERT_DIR):
+    """Return (cert, key) paths of a self-signed certificate for localhost, creating it once."""
+    cert_path = os.path.join(cert_dir, "cert.pem")
+    key_path = os.path.join(cert_dir, "key.pem")
+    if os.path.exists(cert_path) and os.path.exists(key_path):
+        return cert_path, key_path
+    if x509 is None:
+        raise RuntimeError("Generating the sink certificate needs cryptography. Install it with: uv sync --extra sink")
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    public_key = key.public_key()
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(public_key)
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=3650))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"),
+            x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+            x509.IPAddress(ipaddress.ip_address("::1")),
+        ]), critical=False)
+        # Self-signed: the certificate is its own CA, so clients can trust it via SMTP_CA_FILE
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(x509.KeyUsage(
+            digital_signature=True, key_cert_sign=True, crl_sign=True, content_commitment=False,
+            key_encipherment=False, data_encipherment=False, key_agreement=False,
+            encipher_only=False, decipher_only=False,
+        ), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(public_key), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+
+    os.makedirs(cert_dir, exist_ok=True)
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    with open(cert_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    logging.info(f"🔐 Generated self-signed sink certificate {cert_path}")
+    return cert_path, key_path
+
+
+def parse_latency(specs):
+    """['0.05', 'DATA=0.2'] -> {'*': 0.05, 'DATA': 0.2} (seconds before the reply)."""
+    latency = {}
+    for spec in specs or ():
+        command, _, seconds = spec.rpartition("=")
+        command = command.upper() or "*"
+        if command != "*" and command not in COMMANDS:
+            raise ValueError(f"Unknown command {command!r} in latency {spec!r}")
+        latency[command] = float(seconds)
+    return latency
+
+
+def parse_failures(specs):
+    """['RCPT=0.01:550', 'DATA=0.05'] -> {'RCPT': (0.01, 550), 'DATA': (0.05, 451)}."""
+    failures = {}
+    for spec in specs or ():
+        command, _, rest = spec.partition("=")
+        command = command.upper()
+        if command not in COMMANDS or command == "QUIT":
+            raise ValueError(f"Unknown command {command!r} in failure {spec!r}")
+        rate, _, code = rest.partition(":")
+        failures[command] = (float(rate), int(code or 451))
+    return failures
+
+
+class SinkStats:
+    """Counters of one sink run."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = 0
+        self.recipients = 0
+        self.bytes = 0
+        self.rejected = Counter()
+        self.first_message = None
+        self.last_message = None
+
+    def message(self, recipients, size):
+        now = time.monotonic()
+        if self.first_message is None:
+            self.first_message = now
+        self.last_message = now
+        self.messages += 1
+        self.recipients += recipients
+        self.bytes += size
+
+    def snapshot(self):
+        """Counters plus messages/second between the first and the last accepted message."""
+        elapsed = (self.last_message - self.first_message) if self.messages > 1 else 0.0
+        return {
+            "sessions": self.sessions,
+            "messages": self.messages,
+            "recipients": self.recipients,
+            "bytes": self.bytes,
+            "rejected": dict(self.rejected),
+            "elapsed_seconds": round(elapsed, 3),
+            "messages_per_second": round((self.messages - 1) / elapsed, 2) if elapsed else None,
+        }
+
+
+class _Session:
+    def __init__(self):
+        self.tls = False
+        self.reset()
+
+    def reset(self):
+        self.sender = None
+        self.recipients = []
+
+
+class SMTPSink:
+    """Discarding SMTP server with per-command latency and failure injection."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, starttls=True, cert=None, key=None,
+                 cert_dir=CERT_DIR, latency=None, failures=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency or {}
+        self.failures = failures or {}
+        self.random = random.Random(seed)
+        self.stats = SinkStats()
+        self.ssl_context = None
+        self.cert = None
+        if starttls:
+            if not hasattr(asyncio.StreamWriter, "start_tls"):
+                raise RuntimeError("STARTTLS in the sink needs Python 3.11 or newer (or run it with starttls off)")
+            if not cert:
+                cert, key = generate_certificate(cert_dir)
+            self.cert = cert
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(cert, key)
+        self._server = None
+        self._sessions = {}
+        self._loop = None
+        self._thread = None
+
+    # Running
+
+    async def start(self):
+        """Start listening on the current event loop."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=LINE_LIMIT)
+        # Port 0 picks a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.stats = SinkStats()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_background(self):
+        """Run the sink on its own event loop thread (for in-process benchmarks); returns self."""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    async def close(self):
+        """Stop listening and drop the open sessions (clients see the connection close)."""
+        self._server.close()
+        for writer in list(self._sessions.values()):
+            # abort(): a TLS close would wait for the idle client's close_notify
+            writer.transport.abort()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stop(self):
+        """Stop a sink started with start_background()."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def __enter__(self):
+        return self.start_background()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def client_environment(self):
+        """Environment variables that point the campaign scripts at this sink."""
+        env = {"SMTP_SERVER": self.host, "SMTP_PORT": str(self.port)}
+        if self.ssl_context is None:
+            env["SMTP_STARTTLS"] = "0"
+        else:
+            env["SMTP_CA_FILE"] = os.path.abspath(self.cert)
+        return env
+
+    # Protocol
+
+    async def _reply(self, writer, code, text, last=True):
+        writer.write(f"{code}{' ' if last else '-'}{text}\r\n".encode())
+        await writer.drain()
+
+    async def _delay(self, command):
+        seconds = self.latency.get(command, self.latency.get("*", 0))
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def _injected(self, command):
+        """Error code to answer command with, or None."""
+        rate, code = self.failures.get(command, (0, None))
+        if rate and self.random.random() < rate:
+            self.stats.rejected[command] += 1
+            return code
+        return None
+
+    async def _reject(self, writer, code):
+        await self._reply(writer, code, REPLY_TEXT.get(code, "Injected failure"))
+        return code == 421
+
+    async def _handle(self, reader, writer):
+        self.stats.sessions += 1
+        self._sessions[asyncio.current_task()] = writer
+        session = _Session()
+        try:
+            await self._delay("CONNECT")
+            code = self._injected("CONNECT")
+            if code:
+                await self._reject(writer, code)
+                return
+            await self._reply(writer, 220, "localhost ESMTP sink")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                verb, _, argument = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+                verb = verb.upper()
+                await self._delay(verb)
+                # DATA failures are answered after the payload, like a content rejection
+                code = None if verb == "DATA" else self._injected(verb)
+                if code:
+                    if await self._reject(writer, code):
+                        return
+                    continue
+                if not await self._command(reader, writer, session, verb, argument):
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError) as e:
+            logging.debug(f"Sink session ended: {e}")
+        finally:
+            self._sessions.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _command(self, reader, writer, session, verb, argument):
+        """Answer one command; returns False when the session is over."""
+        if verb in ("EHLO", "HELO"):
+            session.reset()
+            if verb == "HELO":
+                await self._reply(writer, 250, "localhost")
+                return True
+            extensions = ["localhost", "8BITMIME", f"SIZE {50 * 1024 * 1024}"]
+            if self.ssl_context is not None and not session.tls:
+                extensions.append("STARTTLS")
+            extensions.append("AUTH PLAIN LOGIN")
+            for i, extension in enumerate(extensions):
+                await self._reply(writer, 250, extension, last=i == len(extensions) - 1)
+        elif verb == "STARTTLS":
+            if self.ssl_context is None or session.tls:
+                await self._reply(writer, 502, "5.5.1 STARTTLS not available")
+                return True
+            await self._reply(writer, 220, "2.0.0 Ready to start TLS")
+            await writer.start_tls(self.ssl_context)
+            session.tls = True
+            session.reset()
+        elif verb == "AUTH":
+            await self._auth(reader, writer, argument)
+        elif verb == "MAIL":
+            session.reset()
+            session.sender = argument
+            await self._reply(writer, 250, "2.1.0 OK")
+        elif verb == "RCPT":
+            if session.sender is None:
+                await self._reply(writer, 503, "5.5.1 MAIL first")
+                return True
+            session.recipients.append(argument)
+            await self._reply(writer, 250, "2.1.5 OK")
+        elif verb == "DATA":
+            if not session.recipients:
+                await self._reply(writer, 503, "5.5.1 RCPT first")
+                return True
+            await self._reply(writer, 354, "End data with <CR><LF>.<CR><LF>")
+            size = 0
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return False
+                if line == b".\r\n":
+                    break
+                size += len(line)
+            recipients = len(session.recipients)
+            code = self._injected("DATA")
+            session.reset()
+            if code:
+                return not await self._reject(writer, code)
+            self.stats.message(recipients, size)
+            await self._reply(writer, 250, "2.0.0 OK: queued")
+        elif verb == "RSET":
+            session.reset()
+            await self._reply(writer, 250, "2.0.0 OK")
+        elif verb == "NOOP":
+            await self._reply(writer, 250, "2.0.0 OK")
+        elif verb == "QUIT":
+            await self._reply(writer, 221, "2.0.0 Bye")
+            return False
+        else:
+            await self._reply(writer, 502, "5.5.2 Command not recognized")
+        return True
+
+    async def _auth(self, reader, writer, argument):
+        """Accept AUTH PLAIN and AUTH LOGIN with any credentials."""
+        mechanism, _, initial = argument.partition(" ")
+        mechanism = mechanism.upper()
+        if mechanism == "PLAIN":
+            if not initial:
+                await self._reply(writer, 334, "")
+                await reader.readline()
+        elif mechanism == "LOGIN":
+            if not initial:
+                await self._reply(writer, 334, base64.b64encode(b"Username:").decode())
+                await reader.readline()
+            await self._reply(writer, 334, base64.b64encode(b"Password:").decode())
+            await reader.readline()
+        else:
+            await self._reply(writer, 504, "5.5.4 Unrecognized authentication type")
+            return
+        await self._reply(writer, 235, "2.7.0 Authentication successful")
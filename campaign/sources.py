@@ -0,0 +1,247 @@
+"""
+Recipient sources for the campaign pipeline.
+A source loads its input, selects (filters and deduplicates) the
+recipients that still need the mail and records every outcome:
+
+    load()                                   read the input
+    mark_sent({email: sent_at})              addresses the journal lists as served (campaigns without an index)
+    select() -> [Recipient]                  filter / dedup (a generator for streaming sources)
+    log_plan()                               log what select() found
+    record(recipient, success, sent_at=None, preview=False)
+    finish()                                 flush / write outputs
+"""
+
+import logging
+
+import pandas as pd
+
+from campaign.addresses import normalize_email, normalized_emails
+from campaign.orders_cache import load_orders
+from campaign.pipeline import Recipient
+from campaign.planning import CATEGORY_COLUMN, EMAIL_COLUMN, FIRST_NAME_COLUMN, plan_recipients
+from campaign.sheet_buffer import SheetWriteBuffer
+from campaign.sheet_snapshot import read_sheet
+from campaign.sheet_table import SheetTable
+
+# Rows per chunk when streaming a CSV export
+CSV_CHUNK_ROWS = 5000
+
+
+class StaticSource:
+    """A fixed list of Recipients (one-off mails); nothing is recorded."""
+
+    def __init__(self, recipients):
+        self.recipients = list(recipients)
+
+    def load(self):
+        pass
+
+    def mark_sent(self, sent):
+        sent = {normalize_email(email) for email in sent}
+        self.recipients = [recipient for recipient in self.recipients if normalize_email(recipient.email) not in sent]
+
+    def select(self):
+        return self.recipients
+
+    def log_plan(self):
+        logging.info(f"📋 {len(self.recipients)} recipient(s): {', '.join(r.email for r in self.recipients)}")
+
+    def record(self, recipient, success, sent_at=None, preview=False):
+        pass
+
+    def finish(self):
+        pass
+
+
+class CsvSource:
+    """
+    Eventfrog Orders CSV export.
+    select() keeps rows with a valid email whose sent_column is still empty and
+    groups them to one recipient per address (data: first_name, is_goldau;
+    context: the row labels). Outcomes go to the campaign's delivery journal
+    only; the tracking CSV/Excel copy is built on demand (see campaign.report).
+    The export is loaded through the columnar orders cache (see campaign.orders_cache),
+    only the Email, First name, Category and sent_column columns.
+    """
+
+    def __init__(self, path, sent_column, use_cache=True):
+        self.path = path
+        self.sent_column = sent_column
+        self.use_cache = use_cache
+        self.columns = {EMAIL_COLUMN, FIRST_NAME_COLUMN, CATEGORY_COLUMN, sent_column}
+        self.df = None
+        self.plan = None
+
+    def load(self):
+        df = load_orders(self.path, use_cache=self.use_cache, columns=self.columns)
+        logging.info(f"Loaded {len(df)} records from CSV")
+        if self.sent_column not in df.columns:
+            df[self.sent_column] = ''
+            logging.info(f"Added '{self.sent_column}' column")
+        self.df = df
+
+    def mark_sent(self, sent):
+        sent = {normalize_email(email): sent_at for email, sent_at in sent.items()}
+        keys = normalized_emails(self.df[EMAIL_COLUMN])
+        resumed = keys.isin(sent.keys())
+        self.df.loc[resumed, self.sent_column] = keys[resumed].map(sent)
+
+    def select(self):
+        logging.info("📋 Analyzing emails and grouping duplicates...")
+        self.plan = plan_recipients(self.df, sent_column=self.sent_column)
+        return [
+            Recipient(email, {"first_name": first_name, "is_goldau": is_goldau}, context=rows)
+            for email, first_name, is_goldau, rows in self.plan.items()
+        ]
+
+    def log_plan(self):
+        plan = self.plan
+        logging.info(f"\n📊 Email Analysis:")
+        logging.info(f"   Total entries with valid emails: {plan.candidate_rows}")
+        logging.info(f"   Unique email addresses: {len(plan)}")
+        logging.info(f"   Duplicate entries (will be skipped): {plan.duplicate_rows}")
+        logging.info(f"   Already sent (will be skipped): {plan.already_sent_rows}")
+        logging.info(f"   ✅ Each person will receive ONLY ONE email!\n")
+
+    def record(self, recipient, success, sent_at=None, preview=False):
+        # The delivery journal is the status store
+        pass
+
+    def finish(self):
+        pass
+
+
+class StreamingCsvSource:
+    """
+    Eventfrog Orders CSV export, read in chunks for season exports too big to load at once.
+    select() returns a generator: every chunk (only the Email, First name,
+    Category and sent_column columns) is planned like CsvSource and its new
+    addresses are yielded straight into delivery. An address is sent with the
+    rows of the chunk it first appears in; later rows with that address only
+    count as duplicates.
+    With goldau_priority (the Goldau notice changes the email's content) an
+    address is only final once it has a Goldau ticket: Goldau addresses are
+    sent right away, the others are held back until a Goldau ticket in a later
+    chunk or the end of the file settles them. Those wait for the whole file
+    to be read and are kept in memory meanwhile (address, first name and row
+    numbers). Campaigns that ignore is_goldau pass goldau_priority=False and
+    stream everything from the first chunk on. Like CsvSource, outcomes go to
+    the delivery journal only.
+    """
+
+    def __init__(self, path, sent_column, chunk_size=CSV_CHUNK_ROWS, goldau_priority=True):
+        self.path = path
+        self.sent_column = sent_column
+        self.chunk_size = chunk_size
+        self.goldau_priority = goldau_priority
+        self.columns = {EMAIL_COLUMN, FIRST_NAME_COLUMN, CATEGORY_COLUMN, sent_column}
+        self.seen = set()
+        self.counts = {}
+
+    def load(self):
+        # Nothing is read up front; select() streams the file
+        self.seen = set()
+        self.counts = dict.fromkeys(("total", "valid", "already_sent", "candidates", "unique"), 0)
+
+    def mark_sent(self, sent):
+        self.seen.update(normalize_email(email) for email in sent)
+
+    def select(self):
+        logging.info(f"📋 Streaming {self.path} in chunks of {self.chunk_size} rows...")
+        counts = self.counts
+        # Addresses without a Goldau ticket so far, in file order
+        held_back = {}
+        chunks = pd.read_csv(
+            self.path, encoding='utf-8-sig', chunksize=self.chunk_size,
+            usecols=lambda column: column in self.columns,
+        )
+        for chunk in chunks:
+            plan = plan_recipients(chunk, sent_column=self.sent_column)
+            counts["total"] += plan.total_rows
+            counts["valid"] += plan.valid_rows
+            counts["already_sent"] += plan.already_sent_rows
+            counts["candidates"] += plan.candidate_rows
+            for email, first_name, is_goldau, rows in plan.items():
+                key = normalize_email(email)
+                if key in self.seen:
+                    # A Goldau ticket in a later chunk still gets the Goldau version
+                    if is_goldau and key in held_back:
+                        recipient = held_back.pop(key)
+                        recipient.data["is_goldau"] = True
+                        yield recipient
+                    continue
+                self.seen.add(key)
+                counts["unique"] += 1
+                recipient = Recipient(email, {"first_name": first_name, "is_goldau": is_goldau}, context=rows)
+                if is_goldau or not self.goldau_priority:
+                    yield recipient
+                else:
+                    held_back[key] = recipient
+        # No Goldau ticket anywhere in the file
+        yield from held_back.values()
+
+    def log_plan(self):
+        counts = self.counts
+        logging.info(f"\n📊 Email Analysis:")
+        logging.info(f"   Rows read: {counts['total']}")
+        logging.info(f"   Total entries with valid emails: {counts['candidates']}")
+        logging.info(f"   Unique email addresses: {counts['unique']}")
+        logging.info(f"   Duplicate entries (will be skipped): {counts['candidates'] - counts['unique']}")
+        logging.info(f"   Already sent (will be skipped): {counts['already_sent']}")
+        logging.info(f"   ✅ Each person will receive ONLY ONE email!\n")
+
+    def record(self, recipient, success, sent_at=None, preview=False):
+        pass
+
+    def finish(self):
+        pass
+
+
+class SheetSource:
+    """
+    Google Sheet, read in one request (reusing the local snapshot when unchanged).
+    The campaign supplies the sheet-specific parts:
+      select(source) -> [Recipient]   reads source.table, may add headers via source.writes
+                                      and keep column positions on the source
+      record(source, recipient, success, preview)   writes through source.writes
+    source.writes is a SheetWriteBuffer, so outcomes reach the sheet in batches.
+    """
+
+    def __init__(self, sheet, select, record, use_cache=True):
+        self.sheet = sheet
+        self._select = select
+        self._record = record
+        self.use_cache = use_cache
+        self.snapshot = None
+        self.table = None
+        self.writes = None
+        self.recipients = []
+
+    def load(self):
+        self.snapshot = read_sheet(self.sheet, use_cache=self.use_cache)
+        self.table = SheetTable(self.snapshot.values)
+        self.writes = SheetWriteBuffer(self.sheet, snapshot=self.snapshot)
+
+    def mark_sent(self, sent):
+        # The sheet's own status column already records delivered rows
+        pass
+
+    def select(self):
+        if not len(self.table):
+            logging.warning("No records found in the sheet")
+            self.recipients = []
+        else:
+            self.recipients = self._select(self)
+        return self.recipients
+
+    def log_plan(self):
+        logging.info(f"📋 {len(self.recipients)} row(s) ready to send")
+
+    def record(self, recipient, success, sent_at=None, preview=False):
+        self._record(self, recipient, success, preview)
+
+    def finish(self):
+        if self.writes is not None:
+            self.writes.close()
+            # Only formatting (--test) leaves the snapshot usable for the next run
+            self.snapshot.save()
@@ -0,0 +1,171 @@
+"""
+Global suppression list: addresses no campaign may mail again.
+Fed automatically by permanent mailbox rejections (550/551/553 or 5.1.x
+on RCPT, i.e. unknown mailboxes) and by hand (unsubscribes, complaints) via
+suppress.py. Stored in SQLite with the normalised address as primary key
+and checked in bulk while a campaign is planned, so a dead address costs
+one index lookup instead of an SMTP handshake in every later campaign.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+from campaign.addresses import normalize_email
+
+DEFAULT_SUPPRESSION_PATH = os.getenv("SUPPRESSION_LIST", os.path.join("data", "suppressions.sqlite3"))
+# Addresses per query in bulk lookups
+LOOKUP_BATCH_SIZE = 500
+
+# Replies to RCPT that mean the mailbox does not exist or is not accepted
+MAILBOX_CODES = (550, 551, 553)
+# Enhanced status code at the start of the reply text, e.g. "5.1.1 User unknown"
+ENHANCED_STATUS = re.compile(r"\s*([245]\.\d{1,3})\.\d{1,3}\b")
+
+# Reasons
+REASON_BOUNCE = "bounce"
+REASON_UNSUBSCRIBE = "unsubscribe"
+REASON_MANUAL = "manual"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressions (
+    address TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    detail TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def refused_recipients(error):
+    """{address: (code, message)} of an smtplib/aiosmtplib SMTPRecipientsRefused, else {}."""
+    recipients = getattr(error, "recipients", None)
+    if isinstance(recipients, dict):
+        # smtplib: {address: (code, message)}
+        return {address: tuple(reply) for address, reply in recipients.items()}
+    if recipients:
+        # aiosmtplib: [SMTPRecipientRefused, ...]
+        return {refused.recipient: (refused.code, refused.message) for refused in recipients}
+    return {}
+
+
+def is_mailbox_rejection(code, message):
+    """
+    True if a reply rejects the mailbox itself: 550/551/553, with an enhanced
+    status code (if any) of 5.1.x. Policy rejections (5.7.x, 554) are not.
+    """
+    if code not in MAILBOX_CODES:
+        return False
+    if isinstance(message, bytes):
+        message = message.decode("utf-8", errors="replace")
+    enhanced = ENHANCED_STATUS.match(str(message))
+    return enhanced is None or enhanced.group(1) == "5.1"
+
+
+def is_permanent_failure(error, recipients):
+    """
+    True if the To address (recipients[0]) was rejected as a mailbox while
+    the other recipients of the message (the BCC copy) were accepted. When
+    every recipient is refused the server or a relay policy is the problem,
+    not the address, so nothing is suppressed; the same goes for other 5xx
+    replies (authentication, sender refused, content rejected after DATA).
+    """
+    refused = refused_recipients(error)
+    if len(refused) != 1 or len(recipients) < 2 or recipients[0] not in refused:
+        return False
+    return is_mailbox_rejection(*refused[recipients[0]])
+
+
+class SuppressionList:
+    """Normalised address -> (reason, detail) in a SQLite file."""
+
+    def __init__(self, path=DEFAULT_SUPPRESSION_PATH, read_only=False):
+        self.path = path
+        if read_only:
+            # Lookups only (simulations): the file must exist and is left untouched. Without
+            # a -wal file everything is in the main file, which is read as immutable so no
+            # -wal/-shm files are created; otherwise a writer is active and they exist anyway
+            mode = "mode=ro" if os.path.exists(path + "-wal") else "immutable=1"
+            uri = f"file:{pathname2url(os.path.abspath(path))}?{mode}"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def add(self, email, reason=REASON_MANUAL, detail=""):
+        """Suppress an address (an existing entry is replaced)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO suppressions (address, email, reason, detail, created_at) VALUES (?, ?, ?, ?, ?)",
+                (normalize_email(email), str(email).strip(), reason, detail,
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+            )
+            self._conn.commit()
+
+    def remove(self, email):
+        """Lift the suppression of an address; returns True if it was suppressed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM suppressions WHERE address = ?", (normalize_email(email),))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def reason(self, email):
+        """Why the address is suppressed, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reason FROM suppressions WHERE address = ?", (normalize_email(email),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def suppressed_many(self, emails):
+        """{normalised address: reason} for those of emails that are suppressed."""
+        addresses = list({normalize_email(email) for email in emails})
+        found = {}
+        with self._lock:
+            for start in range(0, len(addresses), LOOKUP_BATCH_SIZE):
+                batch = addresses[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT address, reason FROM suppressions WHERE address IN ({placeholders})", batch
+                ))
+        return found
+
+    def entries(self):
+        """All entries as (email, reason, detail, created_at), newest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT email, reason, detail, created_at FROM suppressions ORDER BY created_at DESC"
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_lists = {}
+_lists_lock = threading.Lock()
+
+
+def get_suppression_list(path=DEFAULT_SUPPRESSION_PATH, read_only=False):
+    """Return the shared SuppressionList for path, opening it on first use."""
+    with _lists_lock:
+        suppressions = _lists.get((path, read_only))
+        if suppressions is None:
+            suppressions = SuppressionList(path, read_only)
+            _lists[(path, read_only)] = suppressions
+        return suppressions
@@ -0,0 +1,192 @@
+"""
+Precompiled HTML email templates for the Rigibeats mail scripts.
+A campaign body is parsed once into static chunks and ${field} slots; the
+MIME headers, boundaries and static chunks are encoded to wire bytes up
+front, so rendering a recipient only encodes their own fields and joins
+bytes instead of rebuilding and re-encoding a MIMEMultipart every time.
+Inline images and attachments come pre-encoded from the shared AssetCache;
+personalised attachments stay file references and are streamed at send time.
+"""
+
+import binascii
+import functools
+import secrets
+import string
+from email.header import Header
+
+from campaign.assets import Asset, get_asset_cache
+
+CRLF = b"\r\n"
+# Ends every encoded chunk so quoted-printable line lengths restart at each splice point
+SOFT_BREAK = b"=" + CRLF
+# Marks where per-recipient attachments go in a compiled template
+_PERSONAL = object()
+
+
+class OutgoingMessage:
+    """
+    A fully rendered message: envelope plus what to put on the wire.
+    data is either the complete message bytes or, for messages with personalised
+    attachments, a list of bytes and Asset pieces that chunks() expands lazily.
+    """
+
+    __slots__ = ("sender", "recipients", "data")
+
+    def __init__(self, sender, recipients, data):
+        self.sender = sender
+        self.recipients = recipients
+        self.data = data
+
+    @property
+    def streamed(self):
+        return not isinstance(self.data, bytes)
+
+    def chunks(self):
+        """Yield the message bytes piece by piece (can be called again for a retry)."""
+        if not self.streamed:
+            yield self.data
+            return
+        for piece in self.data:
+            if isinstance(piece, Asset):
+                yield from piece.stream()
+            else:
+                yield piece
+
+    def as_bytes(self):
+        return b"".join(self.chunks())
+
+
+@functools.lru_cache(maxsize=4096)
+def encode_chunk(text):
+    """Quoted-printable encode a piece of body text into CRLF wire bytes."""
+    if not text:
+        return b""
+    encoded = binascii.b2a_qp(text.encode("utf-8"), istext=True)
+    return encoded.replace(b"\r\n", b"\n").replace(b"\n", CRLF) + SOFT_BREAK
+
+
+def _boundary():
+    return f"=_rigibeats_{secrets.token_hex(8)}"
+
+
+def encode_header(name, value):
+    """Encode one header line, using an RFC 2047 encoded word for non-ASCII values."""
+    value = str(value)
+    if not value.isascii():
+        value = Header(value, "utf-8", header_name=name).encode(linesep="\r\n")
+    return f"{name}: {value}".encode("ascii") + CRLF
+
+
+class CompiledTemplate:
+    """
+    An HTML email compiled once per campaign.
+    html uses string.Template placeholders (${greeting}); literal CSS braces need
+    no escaping. Placeholders named in constants (links etc.) are filled in at
+    compile time; the rest are per-recipient fields, inserted as-is like the
+    f-strings they replace.
+    Inline images (referenced as cid: in the html) are wrapped with the body in
+    multipart/related, attachments in multipart/mixed. Messages that get
+    per-recipient attachments are rendered from a variant compiled with
+    personal_attachments=True, which always has the multipart/mixed layer.
+    """
+
+    def __init__(self, html, sender, subject, bcc=None, constants=None,
+                 inline_images=(), attachments=(), personal_attachments=False, asset_cache=None):
+        self._args = dict(
+            html=html, sender=sender, subject=subject, bcc=bcc, constants=constants,
+            inline_images=inline_images, attachments=attachments, asset_cache=asset_cache
+        )
+        self._personal_variant = self if personal_attachments else None
+        self.sender = sender
+        self.bcc = bcc
+        self.assets = asset_cache or get_asset_cache()
+        self.fields = []
+        self._chunks = []
+        self._parse(html, constants or {})
+
+        # Outermost container first; the html part sits inside the innermost one
+        layers = []
+        if attachments or personal_attachments:
+            layers.append(("mixed", list(attachments)))
+        if inline_images:
+            layers.append(("related", list(inline_images)))
+        if not layers:
+            layers.append(("alternative", []))
+
+        head = encode_header("From", sender) + encode_header("Subject", subject) + b"MIME-Version: 1.0" + CRLF
+        tail = []
+        for subtype, parts in layers:
+            boundary = _boundary().encode("ascii")
+            content_type = b"Content-Type: multipart/" + subtype.encode("ascii")
+            if subtype == "related":
+                content_type += b'; type="text/html"'
+            head += content_type + b'; boundary="' + boundary + b'"' + CRLF + CRLF + b"--" + boundary + CRLF
+            closing = []
+            for part in parts:
+                closing += [CRLF + b"--" + boundary + CRLF, part]
+            if subtype == "mixed" and personal_attachments:
+                self._personal_delimiter = CRLF + b"--" + boundary + CRLF
+                closing.append(_PERSONAL)
+            closing.append(CRLF + b"--" + boundary + b"--" + CRLF)
+            tail = closing + tail
+        head += (
+            b'Content-Type: text/html; charset="utf-8"' + CRLF
+            + b"MIME-Version: 1.0" + CRLF
+            + b"Content-Transfer-Encoding: quoted-printable" + CRLF
+            + CRLF
+        )
+        self._chunks.insert(0, head)
+        self._chunks += tail
+
+    def _parse(self, html, constants):
+        """Split html into pre-encoded static chunks and field names (None marks a slot)."""
+        pattern = string.Template.pattern
+        position = 0
+        for match in pattern.finditer(html):
+            self._chunks.append(encode_chunk(html[position:match.start()]))
+            position = match.end()
+            if match.group("escaped") is not None:
+                self._chunks.append(encode_chunk("$"))
+                continue
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                raise ValueError(f"Invalid placeholder in template at offset {match.start()}")
+            if name in constants:
+                self._chunks.append(encode_chunk(str(constants[name])))
+                continue
+            self.fields.append(name)
+            self._chunks.append(None)
+        self._chunks.append(encode_chunk(html[position:]))
+
+    def render(self, to_email, attachments=(), **fields):
+        """Build the OutgoingMessage for one recipient (attachments: their personal Assets)."""
+        if attachments and self._personal_variant is not self:
+            if self._personal_variant is None:
+                self._personal_variant = CompiledTemplate(**self._args, personal_attachments=True)
+            return self._personal_variant.render(to_email, attachments, **fields)
+        values = iter(fields.get(name, "") for name in self.fields)
+        pieces = [encode_header("To", to_email)]
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                pieces.append(chunk)
+            elif chunk is None:
+                pieces.append(encode_chunk(str(next(values))))
+            elif chunk is _PERSONAL:
+                for attachment in attachments:
+                    pieces += [self._personal_delimiter, attachment]
+            else:
+                pieces.append(self.assets.part(chunk))
+        recipients = [to_email, self.bcc] if self.bcc else [to_email]
+        if not attachments:
+            return OutgoingMessage(self.sender, recipients, b"".join(pieces))
+
+        # Join the static runs, keep the personalised files as references
+        data, run = [], []
+        for piece in pieces:
+            if isinstance(piece, bytes):
+                run.append(piece)
+                continue
+            data += [b"".join(run), piece]
+            run = []
+        data.append(b"".join(run))
+        return OutgoingMessage(self.sender, recipients, data)
@@ -1,8 +1,9 @@
 import os
 from dotenv import load_dotenv
 import logging
-import gspread
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials
+from campaign.sheet_backend import BACKEND_FAKE, SHEET_BACKEND, open_worksheet
+from campaign.sheet_snapshot import load_sheet_values
+from campaign.sheet_table import SheetTable
 
 load_dotenv()
 
@@ -19,17 +20,9 @@ ACCESS_KEY_COLUMN = "Access Key"
 
 
 def connect_to_sheet():
-    """Connect to Google Sheets using service account credentials."""
+    """Connect to Google Sheets (or the SHEET_BACKEND=fake stand-in) using service account credentials."""
     try:
-        scopes = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        credentials = ServiceAccountCredentials.from_service_account_file(
-            CREDENTIALS_FILE, scopes=scopes
-        )
-        client = gspread.authorize(credentials)
-        sheet = client.open_by_key(SPREADSHEET_ID).sheet1
+        sheet = open_worksheet(SPREADSHEET_ID, CREDENTIALS_FILE)
         logging.info("Successfully connected to Google Sheets")
         return sheet
     except Exception as e:
@@ -40,11 +33,11 @@ def connect_to_sheet():
 def export_access_keys(sheet):
     """Export all access keys in multiple formats."""
     try:
-        # Get header row
-        headers = sheet.row_values(1)
+        # Get all rows (reusing the local snapshot if the sheet is unchanged)
+        table = SheetTable(load_sheet_values(sheet))
         
         # Find Access Key column
-        access_key_indices = [i for i, h in enumerate(headers) if h == ACCESS_KEY_COLUMN]
+        access_key_indices = table.column_indices(ACCESS_KEY_COLUMN)
         
         if not access_key_indices:
             logging.error(f"'{ACCESS_KEY_COLUMN}' column not found in the sheet")
@@ -54,7 +47,7 @@ def export_access_keys(sheet):
         logging.info(f"Found '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
         
         # Get all values from the Access Key column (skip header)
-        all_keys = sheet.col_values(key_col_idx)[1:]  # Skip header row
+        all_keys = table.column(ACCESS_KEY_COLUMN)
         
         # Filter out empty values and strip whitespace
         valid_keys = [key.strip() for key in all_keys if key and key.strip()]
@@ -109,13 +102,13 @@ def main():
     """Main function to run the export script."""
     logging.info("Starting access key export script...")
     
-    # Validate environment variables
-    if not SPREADSHEET_ID:
+    # Validate environment variables (the fake sheet backend needs no spreadsheet)
+    if SHEET_BACKEND != BACKEND_FAKE and not SPREADSHEET_ID:
         logging.error("Missing SPREADSHEET_ID environment variable. Check your .env file.")
         return
 
     # Check if credentials file exists
-    if not os.path.exists(CREDENTIALS_FILE):
+    if SHEET_BACKEND != BACKEND_FAKE and not os.path.exists(CREDENTIALS_FILE):
         logging.error(f"Credentials file not found: {CREDENTIALS_FILE}")
         return
 
@@ -0,0 +1,40 @@
+"""
+Import an Eventfrog Orders export into the columnar cache
+Campaign scripts load the cache instead of re-parsing the CSV; it is
+rebuilt automatically whenever the CSV changes.
+"""
+
+import argparse
+import logging
+from campaign.orders_cache import import_orders
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+DEFAULT_CSV = "data/24 Jan 2026 1300 - Rigibeats 2026 - Orders.csv"
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Convert Eventfrog Orders CSV exports into the columnar cache')
+    parser.add_argument(
+        'csv_files',
+        nargs='*',
+        default=[DEFAULT_CSV],
+        metavar='CSV',
+        help=f'Orders export(s) to import (default: {DEFAULT_CSV})'
+    )
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        try:
+            import_orders(csv_file)
+        except (OSError, RuntimeError) as e:
+            logging.error(f"Could not import {csv_file}: {e}")
+
+    logging.info("Script finished.")
+
+
+if __name__ == "__main__":
+    main()
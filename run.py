@@ -1,29 +1,22 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
-from dotenv import load_dotenv
 from tqdm import tqdm
 import logging
-import gspread
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-import secrets
-import string
+from gspread.utils import rowcol_to_a1
 import argparse
+from campaign import settings
+from campaign.access_keys import AccessKeyGenerator
+from campaign.cli import add_delivery_arguments, start_metrics_export
+from campaign.pipeline import MODE_DRY_RUN, MODE_PREVIEW, MODE_PRODUCTION, Campaign, Recipient, run_campaign
+from campaign.planning import is_phone_number, is_valid_email
+from campaign.sheet_backend import BACKEND_FAKE, SHEET_BACKEND, open_worksheet
+from campaign.sheet_buffer import SheetWriteBuffer, SheetWriteError
+from campaign.sheet_snapshot import load_sheet_values
+from campaign.sheet_table import SheetTable
+from campaign.sources import SheetSource
+from campaign.templates import CompiledTemplate
+from campaign.engine import BACKEND_THREADS, DEFAULT_WORKERS
 
 
-load_dotenv()
-
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-# SMTP Configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = 587
-EMAIL_ADDRESS = os.getenv("SMTP_ACCOUNT")
-EMAIL_PASSWORD = os.getenv("SMTP_PASSWORD")
-
 # Google Sheets Configuration
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json")
@@ -40,26 +33,45 @@ TICKET_CATEGORY_COLUMN = "Ticketkat."
 STATUS_OPEN = "1. Offen"
 STATUS_SENT = "2. Verschickt"
 
+# Longest run of rows written as one range when storing generated keys
+KEY_WRITE_CHUNK_SIZE = 10000
+
+# Email content
+EMAIL_SUBJECT = "Rigibeats 2026 - Ticket Zugangscode"
+TICKET_LINK = "https://eventfrog.ch/rigibeats"
+
+ACCESS_KEY_HTML = """
+    <html>
+        <body>
+            <p>${greeting}</p>
+            <p>Hier ist dein Zugangsschlüssel für Rigibeats 2026 🎉</p>
+            <p>${ticket_info}</p>
+            <p>Dein Code: <strong>${access_key}</strong></p>
+            <p><a href="${ticket_link}">Jetzt einlösen auf Eventfrog</a></p>
+            <p>See you on the dancefloor ❤️<br>Rigibeats Team</p>
+        </body>
+    </html>
+    """
+
+ACCESS_KEY_TEMPLATE = CompiledTemplate(
+    ACCESS_KEY_HTML, settings.EMAIL_ADDRESS, EMAIL_SUBJECT, bcc=settings.BCC_ADDRESS,
+    constants={"ticket_link": TICKET_LINK}
+)
 
-def generate_access_key(length=12):
-    """Generate a unique access key."""
-    characters = string.ascii_uppercase + string.digits
-    key = ''.join(secrets.choice(characters) for _ in range(length))
-    return f"RB26-{key[:4]}-{key[4:8]}-{key[8:12]}"
+# Sent in test mode so the format can be checked in a real inbox
+TEST_RECIPIENT = Recipient("maximilian.weber@bluewin.ch", {
+    "access_key": "RB26-TEST-DEMO-MAIL",
+    "name": "Max",
+    "grund": "Test Email für Format-Prüfung",
+    "num_tickets": "2",
+    "ticket_category": "VIP",
+})
 
 
 def connect_to_sheet():
-    """Connect to Google Sheets using service account credentials."""
+    """Connect to Google Sheets (or the SHEET_BACKEND=fake stand-in) using service account credentials."""
     try:
-        scopes = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        credentials = ServiceAccountCredentials.from_service_account_file(
-            CREDENTIALS_FILE, scopes=scopes
-        )
-        client = gspread.authorize(credentials)
-        sheet = client.open_by_key(SPREADSHEET_ID).sheet1
+        sheet = open_worksheet(SPREADSHEET_ID, CREDENTIALS_FILE)
         logging.info("Successfully connected to Google Sheets")
         return sheet
     except Exception as e:
@@ -67,79 +79,57 @@ def connect_to_sheet():
         return None
 
 
-def is_valid_email(email):
-    """Basic email validation."""
-    if not email:
-        return False
-    
-    # Convert to string if it's not already (handles phone numbers as integers)
-    email_str = str(email).strip()
-    
-    # Check if it looks like a phone number (only digits, +, -, spaces, parentheses)
-    if email_str.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
-        return False
-    
-    # Basic email validation
-    return "@" in email_str and "." in email_str and len(email_str) > 5
-
-
-def send_email(to_email, access_key, name="", grund="", num_tickets="", ticket_category="", test_mode=False):
-    """Send email with access key to recipient."""
-    try:
-        # Prepare personalized greeting
-        greeting = f"Hey {name}!" if name else "Hey!"
-        
-        # Prepare ticket information
-        ticket_info = ""
-        if num_tickets:
-            ticket_info += f"<strong>Anzahl Tickets:</strong> {num_tickets}<br>"
-        if ticket_category:
-            ticket_info += f"<strong>Ticket-Kategorien:</strong> {ticket_category}<br>"
-        if grund:
-            ticket_info += f"<strong>Grund:</strong> {grund}<br>"
-        
-        subject = "Rigibeats 2026 - Ticket Zugangscode"
-        ticket_link = "https://eventfrog.ch/rigibeats"
-        body = f"""
-        <html>
-            <body>
-                <p>{greeting}</p>
-                <p>Hier ist dein Zugangsschlüssel für Rigibeats 2026 🎉</p>
-                <p>{ticket_info}</p>
-                <p>Dein Code: <strong>{access_key}</strong></p>
-                <p><a href="{ticket_link}">Jetzt einlösen auf Eventfrog</a></p>
-                <p>See you on the dancefloor ❤️<br>Rigibeats Team</p>
-            </body>
-        </html>
-        """
-
-        if test_mode:
-            logging.info(f"✉️  Email: {to_email}")
-            logging.info(f"👤 Name: {name}")
-            logging.info(f"🎟️  Tickets: {num_tickets}")
-            logging.info(f"🏷️  Kategorie: {ticket_category}")
-            logging.info(f"📝 Grund: {grund}")
-            logging.info(f"🔑 Code: {access_key}")
-            logging.info(f"🔗 Link: {ticket_link}")
-            logging.info(f"{'─'*60}")
-            return True
-
-        msg = MIMEMultipart('alternative')
-        msg["From"] = EMAIL_ADDRESS
-        msg["To"] = to_email
-        msg["Bcc"] = "hi@rigibeats.ch"
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, 'html', 'utf-8'))
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-            logging.info(f"Email successfully sent to {to_email}")
-            return True
-    except Exception as e:
-        logging.error(f"Failed to send email to {to_email}: {e}")
-        return False
+def access_key_fields(data):
+    """Template fields for one recipient."""
+    name = data.get("name", "")
+    # Prepare ticket information
+    ticket_info = ""
+    if data.get("num_tickets"):
+        ticket_info += f"<strong>Anzahl Tickets:</strong> {data['num_tickets']}<br>"
+    if data.get("ticket_category"):
+        ticket_info += f"<strong>Ticket-Kategorien:</strong> {data['ticket_category']}<br>"
+    if data.get("grund"):
+        ticket_info += f"<strong>Grund:</strong> {data['grund']}<br>"
+    return {
+        "greeting": f"Hey {name}!" if name else "Hey!",
+        "ticket_info": ticket_info,
+        "access_key": data.get("access_key", ""),
+    }
+
+
+def describe(recipient):
+    """Preview lines for one recipient."""
+    data = recipient.data
+    return [
+        f"✉️  Email: {recipient.email}",
+        f"👤 Name: {data.get('name', '')}",
+        f"🎟️  Tickets: {data.get('num_tickets', '')}",
+        f"🏷️  Kategorie: {data.get('ticket_category', '')}",
+        f"📝 Grund: {data.get('grund', '')}",
+        f"🔑 Code: {data.get('access_key', '')}",
+        f"🔗 Link: {TICKET_LINK}",
+    ]
+
+
+def find_key_column(table, writes):
+    """Return the 1-based Access Key column, queueing the header in writes if it is missing."""
+    # Raises ValueError when the status column is missing
+    table.headers.index(STATUS_COLUMN)
+
+    # Find all occurrences of "Access Key" column
+    access_key_indices = table.column_indices(ACCESS_KEY_COLUMN)
+    if len(access_key_indices) > 1:
+        logging.warning(f"Found {len(access_key_indices)} columns named '{ACCESS_KEY_COLUMN}' at positions {[i+1 for i in access_key_indices]}")
+        logging.warning(f"Using the first one at column {access_key_indices[0]+1}")
+        return access_key_indices[0] + 1
+    if access_key_indices:
+        key_col_idx = access_key_indices[0] + 1
+        logging.info(f"Found '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
+        return key_col_idx
+    key_col_idx = len(table.headers) + 1
+    writes.update_cell(1, key_col_idx, ACCESS_KEY_COLUMN)
+    logging.info(f"Created '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
+    return key_col_idx
 
 
 def export_keys_to_files(newly_generated_keys=None):
@@ -165,61 +155,72 @@ def export_keys_to_files(newly_generated_keys=None):
         logging.error(f"Error exporting access keys: {e}")
 
 
-def generate_keys_only(sheet):
+def key_row_runs(rows, max_length=KEY_WRITE_CHUNK_SIZE):
+    """Split row numbers into (first, last) runs of consecutive rows, each at most max_length long."""
+    runs = []
+    for row in sorted(rows):
+        if runs and row == runs[-1][1] + 1 and row - runs[-1][0] < max_length:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
+
+
+def write_key_column(writes, key_col_idx, new_keys, chunk_size=KEY_WRITE_CHUNK_SIZE):
+    """
+    Write the new keys as one range per run of consecutive rows (all other
+    cells stay untouched), flushing writes every chunk_size keys. Failed
+    flushes stay queued in writes; writes.close() raises if they still fail.
+    """
+    runs = key_row_runs(new_keys, chunk_size)
+    logging.info(f"Writing {len(new_keys)} new keys in {len(runs)} range(s)")
+    queued = 0
+    with tqdm(total=len(new_keys), desc="Writing keys", unit="rows") as progress:
+        for first_row, last_row in runs:
+            range_name = f"{rowcol_to_a1(first_row, key_col_idx)}:{rowcol_to_a1(last_row, key_col_idx)}"
+            writes.update([[new_keys[row]] for row in range(first_row, last_row + 1)], range_name)
+            queued += last_row - first_row + 1
+            if queued >= chunk_size:
+                writes.flush()
+                progress.update(queued)
+                queued = 0
+        writes.flush()
+        progress.update(queued)
+
+
+def generate_keys_only(sheet, use_cache=True):
     """Generate access keys for all entries without sending emails."""
     try:
         logging.info("\n" + "="*60)
         logging.info("🔑 KEY GENERATION MODE - Only generating keys, no emails sent!")
         logging.info("="*60 + "\n")
         
-        # Get header row first to handle empty columns
-        headers = sheet.row_values(1)
-        
-        # Get all data rows
-        all_data = sheet.get_all_values()[1:]  # Skip header row
-        
-        # Create records manually, handling empty headers
-        all_records = []
-        for row_data in all_data:
-            record = {}
-            for idx, header in enumerate(headers):
-                if header:  # Only process non-empty headers
-                    record[header] = row_data[idx] if idx < len(row_data) else ""
-            all_records.append(record)
+        # Get all rows in one read (reusing the local snapshot if the sheet is unchanged)
+        table = SheetTable(load_sheet_values(sheet, use_cache=use_cache))
         
-        if not all_records:
+        if not len(table):
             logging.warning("No records found in the sheet")
             return
         
-        # Find column indices
+        # A created header reaches the sheet together with the first keys
+        writes = SheetWriteBuffer(sheet, flush_every=float("inf"), flush_interval=float("inf"))
         try:
-            status_col_idx = headers.index(STATUS_COLUMN) + 1
-            
-            # Check if Access Key column exists, if not create it
-            # Find all occurrences of "Access Key" column
-            access_key_indices = [i for i, h in enumerate(headers) if h == ACCESS_KEY_COLUMN]
-            
-            if len(access_key_indices) > 1:
-                logging.warning(f"Found {len(access_key_indices)} columns named '{ACCESS_KEY_COLUMN}' at positions {[i+1 for i in access_key_indices]}")
-                logging.warning(f"Using the first one at column {access_key_indices[0]+1}")
-                key_col_idx = access_key_indices[0] + 1
-            elif len(access_key_indices) == 1:
-                key_col_idx = access_key_indices[0] + 1
-                logging.info(f"Found '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
-            else:
-                key_col_idx = len(headers) + 1
-                sheet.update_cell(1, key_col_idx, ACCESS_KEY_COLUMN)
-                logging.info(f"Created '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
+            key_col_idx = find_key_column(table, writes)
         except ValueError as e:
             logging.error(f"Required column not found: {e}")
             return
+        access_key_indices = table.column_indices(ACCESS_KEY_COLUMN)
 
         generated_count = 0
         skipped_count = 0
         newly_generated_keys = []
+        new_keys = {}  # sheet row -> generated key
+        rows_needing_keys = []
 
         # Process each row (starting from row 2, since row 1 is headers)
-        for idx, record in enumerate(tqdm(all_records, desc="Generating keys"), start=2):
+        records = table.records(STATUS_COLUMN, EMAIL_COLUMN, SELBSTKAUF_COLUMN, ACCESS_KEY_COLUMN)
+        for record in tqdm(records, total=len(table), desc="Generating keys", unit="rows"):
+            idx = record.row_number
             status = str(record.get(STATUS_COLUMN, "")).strip()
             email_raw = record.get(EMAIL_COLUMN, "")
             email = str(email_raw).strip() if email_raw else ""
@@ -236,7 +237,7 @@ def generate_keys_only(sheet):
             # Skip if no valid email
             if not is_valid_email(email_raw):
                 email_check = str(email_raw).strip()
-                if email_check and email_check.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
+                if email_check and is_phone_number(email_check):
                     logging.info(f"Row {idx}: Phone number detected ({email_check}), skipping key generation")
                 elif email_check:
                     logging.info(f"Row {idx}: Invalid email ({email_check}), skipping key generation")
@@ -253,12 +254,30 @@ def generate_keys_only(sheet):
                 logging.info(f"Row {idx}: Access key already exists for {email}")
                 skipped_count += 1
             else:
-                # Generate new access key
-                access_key = generate_access_key()
-                sheet.update_cell(idx, key_col_idx, access_key)
-                newly_generated_keys.append(access_key)
-                logging.info(f"Row {idx}: Generated key {access_key} for {email}")
-                generated_count += 1
+                rows_needing_keys.append((idx, email))
+
+        # Generate all missing keys at once, unique against every key already issued
+        key_generator = AccessKeyGenerator(
+            row[i] for row in table.rows for i in access_key_indices if i < len(row)
+        )
+        key_generator.load_orders_exports()
+        for (idx, email), access_key in zip(rows_needing_keys, key_generator.generate(len(rows_needing_keys))):
+            new_keys[idx] = access_key
+            newly_generated_keys.append(access_key)
+            logging.info(f"Row {idx}: Generated key {access_key} for {email}")
+            generated_count += 1
+
+        # Write the new keys back together with a created header
+        if new_keys:
+            write_key_column(writes, key_col_idx, new_keys)
+        try:
+            writes.close()
+        except SheetWriteError as e:
+            # Exporting now would hand out keys the sheet does not know about
+            logging.error(f"❌ Key Generation Failed: {e}")
+            logging.error("No keys exported. The write is retried once more when the script exits; "
+                          "check the sheet, then export its keys with export_keys.py or run --generate-keys again.")
+            return
 
         logging.info(f"\n{'='*60}")
         logging.info(f"🔑 Key Generation Complete!")
@@ -278,160 +297,137 @@ def generate_keys_only(sheet):
         logging.error(f"Error generating keys: {e}")
 
 
-def process_entries(sheet, test_mode=False):
-    """Process all entries with status '1. Offen' and send access keys."""
-    try:
+def record_send_result(sheet, idx, email, success, key_col_idx, status_col_idx, test_mode=False):
+    """Colour the access key cell and update the status of a processed row.
+
+    sheet may be a Worksheet or a SheetWriteBuffer wrapping one.
+    """
+    if success:
+        # Set green background for access key cell
+        sheet.format(rowcol_to_a1(idx, key_col_idx), {
+            "backgroundColor": {
+                "red": 0.85,
+                "green": 1.0,
+                "blue": 0.85
+            }
+        })
+        if not test_mode:
+            # Update status to "2. Verschickt"
+            sheet.update_cell(idx, status_col_idx, STATUS_SENT)
+            logging.info(f"Row {idx}: Email sent to {email}, status updated to '{STATUS_SENT}'")
+        else:
+            logging.info(f"Row {idx}: Would send email to {email}, marked green")
+    else:
+        # Set red background for access key cell on failure
+        sheet.format(rowcol_to_a1(idx, key_col_idx), {
+            "backgroundColor": {
+                "red": 1.0,
+                "green": 0.85,
+                "blue": 0.85
+            }
+        })
         if test_mode:
-            logging.info("\n" + "="*60)
-            logging.info("🧪 TEST MODE ENABLED - No emails will be sent!")
-            logging.info("🧪 Sheet status will NOT be updated!")
-            logging.info("="*60 + "\n")
-        
-        # Get header row first to handle empty columns
-        headers = sheet.row_values(1)
-        
-        # Get all data rows
-        all_data = sheet.get_all_values()[1:]  # Skip header row
-        
-        # Create records manually, handling empty headers
-        all_records = []
-        for row_data in all_data:
-            record = {}
-            for idx, header in enumerate(headers):
-                if header:  # Only process non-empty headers
-                    record[header] = row_data[idx] if idx < len(row_data) else ""
-            all_records.append(record)
-        
-        if not all_records:
-            logging.warning("No records found in the sheet")
-            return
-        
-        # Find column indices
-        try:
-            email_col_idx = headers.index(EMAIL_COLUMN) + 1
-            status_col_idx = headers.index(STATUS_COLUMN) + 1
-            
-            # Check if Access Key column exists, if not create it
-            # Find all occurrences of "Access Key" column
-            access_key_indices = [i for i, h in enumerate(headers) if h == ACCESS_KEY_COLUMN]
-            
-            if len(access_key_indices) > 1:
-                logging.warning(f"Found {len(access_key_indices)} columns named '{ACCESS_KEY_COLUMN}' at positions {[i+1 for i in access_key_indices]}")
-                logging.warning(f"Using the first one at column {access_key_indices[0]+1}")
-                key_col_idx = access_key_indices[0] + 1
-            elif len(access_key_indices) == 1:
-                key_col_idx = access_key_indices[0] + 1
-                logging.info(f"Found '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
-            else:
-                key_col_idx = len(headers) + 1
-                sheet.update_cell(1, key_col_idx, ACCESS_KEY_COLUMN)
-                logging.info(f"Created '{ACCESS_KEY_COLUMN}' column at position {key_col_idx}")
-        except ValueError as e:
-            logging.error(f"Required column not found: {e}")
-            return
-
-        processed_count = 0
-        skipped_count = 0
+            logging.error(f"Row {idx}: Would fail to send email to {email}, marked red")
+        else:
+            logging.error(f"Row {idx}: Failed to send email to {email}, status not updated")
+    return success
 
-        # Process each row (starting from row 2, since row 1 is headers)
-        for idx, record in enumerate(tqdm(all_records, desc="Processing entries"), start=2):
-            # Convert to string and strip to handle both strings and numbers
-            status = str(record.get(STATUS_COLUMN, "")).strip()
-            email_raw = record.get(EMAIL_COLUMN, "")
-            email = str(email_raw).strip() if email_raw else ""
-            selbstkauf = str(record.get(SELBSTKAUF_COLUMN, "")).strip()
-            
-            # Get additional personalization fields
-            name = str(record.get(NAME_COLUMN, "")).strip()
-            grund = str(record.get(GRUND_COLUMN, "")).strip()
-            num_tickets = str(record.get(NUM_TICKETS_COLUMN, "")).strip()
-            ticket_category = str(record.get(TICKET_CATEGORY_COLUMN, "")).strip()
 
-            # Only process entries with status "1. Offen"
-            if status != STATUS_OPEN:
-                continue
-
-            # Skip if Selbstkauf is "Nein" (they bought their own ticket)
-            if selbstkauf == "Nein":
-                continue
+def select_open_rows(source):
+    """Rows with status '1. Offen', not self-bought, with a valid email and an access key."""
+    table = source.table
+    try:
+        table.headers.index(EMAIL_COLUMN)
+        source.status_col_idx = table.headers.index(STATUS_COLUMN) + 1
+        source.key_col_idx = find_key_column(table, source.writes)
+    except ValueError as e:
+        logging.error(f"Required column not found: {e}")
+        return []
+
+    recipients = []
+    source.skipped_count = 0
+    records = table.records(
+        STATUS_COLUMN, EMAIL_COLUMN, SELBSTKAUF_COLUMN, NAME_COLUMN, GRUND_COLUMN,
+        NUM_TICKETS_COLUMN, TICKET_CATEGORY_COLUMN, ACCESS_KEY_COLUMN
+    )
+    for record in tqdm(records, total=len(table), desc="Processing entries"):
+        idx = record.row_number
+        # Convert to string and strip to handle both strings and numbers
+        status = str(record.get(STATUS_COLUMN, "")).strip()
+        email_raw = record.get(EMAIL_COLUMN, "")
+        email = str(email_raw).strip() if email_raw else ""
+        selbstkauf = str(record.get(SELBSTKAUF_COLUMN, "")).strip()
+
+        # Only process entries with status "1. Offen"
+        if status != STATUS_OPEN:
+            continue
+
+        # Skip if Selbstkauf is "Nein" (they bought their own ticket)
+        if selbstkauf == "Nein":
+            continue
+
+        # Skip if no valid email
+        if not is_valid_email(email_raw):
+            email_check = str(email_raw).strip()
+            if email_check and is_phone_number(email_check):
+                logging.warning(f"Row {idx}: Phone number detected ({email_check}), skipping (SMS not supported)")
+            else:
+                logging.warning(f"Row {idx}: Invalid or missing email ({email_check}), skipping")
+            source.skipped_count += 1
+            continue
+
+        # Check if access key exists (required for sending)
+        existing_key_raw = record.get(ACCESS_KEY_COLUMN, "")
+        access_key = str(existing_key_raw).strip() if existing_key_raw else ""
+        if not access_key:
+            logging.warning(f"Row {idx}: No access key found for {email}, skipping. Run with --generate-keys first!")
+            source.skipped_count += 1
+            continue
+
+        recipients.append(Recipient(email, {
+            "access_key": access_key,
+            "name": str(record.get(NAME_COLUMN, "")).strip(),
+            "grund": str(record.get(GRUND_COLUMN, "")).strip(),
+            "num_tickets": str(record.get(NUM_TICKETS_COLUMN, "")).strip(),
+            "ticket_category": str(record.get(TICKET_CATEGORY_COLUMN, "")).strip(),
+        }, context=idx))
+    logging.info(f"Skipped: {source.skipped_count}")
+    return recipients
+
+
+def record_row(source, recipient, success, preview):
+    """Colour the key cell and, for real sends, set the row status."""
+    record_send_result(
+        source.writes, recipient.context, recipient.email, success,
+        source.key_col_idx, source.status_col_idx, test_mode=preview
+    )
 
-            # Skip if no valid email
-            if not is_valid_email(email_raw):
-                # Check if it's a phone number
-                email_check = str(email_raw).strip()
-                if email_check and email_check.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
-                    logging.warning(f"Row {idx}: Phone number detected ({email_check}), skipping (SMS not supported)")
-                else:
-                    logging.warning(f"Row {idx}: Invalid or missing email ({email_check}), skipping")
-                skipped_count += 1
-                continue
 
-            # Check if access key exists (required for sending)
-            existing_key_raw = record.get(ACCESS_KEY_COLUMN, "")
-            access_key = str(existing_key_raw).strip() if existing_key_raw else ""
-            
-            if not access_key:
-                logging.warning(f"Row {idx}: No access key found for {email}, skipping. Run with --generate-keys first!")
-                skipped_count += 1
-                continue
+def access_key_campaign(sheet, use_cache=True):
+    """The access key mailing: open rows of the sheet get their personal code."""
+    return Campaign(
+        name="access-keys",
+        source=SheetSource(sheet, select=select_open_rows, record=record_row, use_cache=use_cache),
+        template=ACCESS_KEY_TEMPLATE,
+        fields=access_key_fields,
+        describe=describe,
+        test_recipients=[TEST_RECIPIENT],
+        # Every open row has its own key, even when several rows share an address
+        once_per_address=False,
+    )
 
-            # Send email with personalized information
-            if send_email(email, access_key, name, grund, num_tickets, ticket_category, test_mode):
-                # Set green background for access key cell
-                sheet.format(f"{chr(64 + key_col_idx)}{idx}", {
-                    "backgroundColor": {
-                        "red": 0.85,
-                        "green": 1.0,
-                        "blue": 0.85
-                    }
-                })
-                if not test_mode:
-                    # Update status to "2. Verschickt"
-                    sheet.update_cell(idx, status_col_idx, STATUS_SENT)
-                    logging.info(f"Row {idx}: Email sent to {email}, status updated to '{STATUS_SENT}'")
-                else:
-                    logging.info(f"Row {idx}: Would send email to {email}, marked green")
-                processed_count += 1
-            else:
-                # Set red background for access key cell on failure
-                sheet.format(f"{chr(64 + key_col_idx)}{idx}", {
-                    "backgroundColor": {
-                        "red": 1.0,
-                        "green": 0.85,
-                        "blue": 0.85
-                    }
-                })
-                if test_mode:
-                    logging.error(f"Row {idx}: Would fail to send email to {email}, marked red")
-                else:
-                    logging.error(f"Row {idx}: Failed to send email to {email}, status not updated")
-                skipped_count += 1
 
-        logging.info(f"\n{'='*60}")
+def process_entries(sheet, test_mode=False, workers=DEFAULT_WORKERS, backend=BACKEND_THREADS, use_cache=True):
+    """Process all entries with status '1. Offen' and send access keys."""
+    try:
+        campaign = access_key_campaign(sheet, use_cache=use_cache)
         if test_mode:
-            logging.info(f"🧪 TEST MODE - Simulation Complete!")
-            logging.info(f"Would have sent {processed_count} emails")
+            logging.info("🧪 Sheet status will NOT be updated!")
+            run_campaign(campaign, MODE_PREVIEW)
+            # Send actual test email in test mode
+            run_campaign(campaign, MODE_DRY_RUN)
         else:
-            logging.info(f"Processing complete!")
-            logging.info(f"Emails sent: {processed_count}")
-        logging.info(f"Skipped: {skipped_count}")
-        logging.info(f"{'='*60}")
-        
-        # Send actual test email in test mode
-        if test_mode:
-            logging.info(f"\n{'='*60}")
-            logging.info("📬 Sending actual test email to maximilian.weber@bluewin.ch...")
-            logging.info(f"{'='*60}\n")
-            send_email(
-                to_email="maximilian.weber@bluewin.ch",
-                access_key="RB26-TEST-DEMO-MAIL",
-                name="Max",
-                grund="Test Email für Format-Prüfung",
-                num_tickets="2",
-                ticket_category="VIP",
-                test_mode=False
-            )
-
+            run_campaign(campaign, MODE_PRODUCTION, workers=workers, backend=backend)
     except Exception as e:
         logging.error(f"Error processing entries: {e}")
 
@@ -465,7 +461,14 @@ Examples:
         dest='test_mode',
         help='Test mode: simulate sending without actually sending emails or updating sheet status'
     )
+    add_delivery_arguments(parser)
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always download the sheet instead of reusing the local snapshot'
+    )
     args = parser.parse_args()
+    start_metrics_export(args)
     
     # Determine mode
     if args.generate_keys:
@@ -477,17 +480,17 @@ Examples:
     
     logging.info("Starting email distribution script...")
     
-    # Validate environment variables
-    required_vars = [SPREADSHEET_ID]
+    # Validate environment variables (the fake sheet backend needs no spreadsheet)
+    required_vars = [SPREADSHEET_ID or SHEET_BACKEND == BACKEND_FAKE]
     if not args.test_mode and not args.generate_keys:
-        required_vars.extend([SMTP_SERVER, EMAIL_ADDRESS, EMAIL_PASSWORD])
+        required_vars.extend([settings.SMTP_SERVER, settings.EMAIL_ADDRESS, settings.EMAIL_PASSWORD])
     
     if not all(required_vars):
         logging.error("Missing required environment variables. Check your .env file.")
         return
 
     # Check if credentials file exists
-    if not os.path.exists(CREDENTIALS_FILE):
+    if SHEET_BACKEND != BACKEND_FAKE and not os.path.exists(CREDENTIALS_FILE):
         logging.error(f"Credentials file not found: {CREDENTIALS_FILE}")
         logging.error("Please follow the setup guide to create service account credentials.")
         return
@@ -500,9 +503,9 @@ Examples:
 
     # Run appropriate mode
     if args.generate_keys:
-        generate_keys_only(sheet)
+        generate_keys_only(sheet, use_cache=not args.no_cache)
     else:
-        process_entries(sheet, test_mode=args.test_mode)
+        process_entries(sheet, test_mode=args.test_mode, workers=args.workers, backend=args.backend, use_cache=not args.no_cache)
     
     logging.info("Script finished.")
 
@@ -3,70 +3,53 @@ Correction Email for Celine Camenzind
 Sends the Goldau-specific railway ticket information
 """
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
-from dotenv import load_dotenv
+import argparse
 import logging
+from campaign import settings
+from campaign.cli import confirm
+from campaign.pipeline import MODE_DRY_RUN, MODE_PRODUCTION, Campaign, Recipient, run_campaign
+from campaign.sources import StaticSource
+from campaign.templates import CompiledTemplate
 
-load_dotenv()
+EMAIL_SUBJECT = "Rigibeats 2026 - Wichtige Info für Goldau-Tickets 🎫🚂"
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-# SMTP Configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = 587
-EMAIL_ADDRESS = os.getenv("SMTP_ACCOUNT")
-EMAIL_PASSWORD = os.getenv("SMTP_PASSWORD")
-
-
-def send_correction_email(to_email="celine.camenzind@bluewin.ch", first_name="Celine"):
-    """Send correction email with Goldau railway ticket info."""
-    try:
-        greeting = f"Hey {first_name}!" if first_name else "Hey!"
-        
-        subject = "Rigibeats 2026 - Wichtige Info für Goldau-Tickets 🎫🚂"
-        
-        body = f"""
+CORRECTION_HTML = """
         <html>
             <head>
                 <style>
-                    body {{
+                    body {
                         font-family: Arial, sans-serif;
                         line-height: 1.6;
                         color: #333;
-                    }}
-                    .container {{
+                    }
+                    .container {
                         max-width: 600px;
                         margin: 0 auto;
                         padding: 20px;
-                    }}
-                    .header {{
+                    }
+                    .header {
                         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                         color: white;
                         padding: 30px;
                         border-radius: 10px 10px 0 0;
                         text-align: center;
-                    }}
-                    .content {{
+                    }
+                    .content {
                         background-color: #ffffff;
                         padding: 30px;
                         border-radius: 0 0 10px 10px;
-                    }}
-                    .important-notice {{
+                    }
+                    .important-notice {
                         background-color: #ffebee;
                         border-left: 4px solid #d32f2f;
                         padding: 15px;
                         margin: 20px 0;
-                    }}
-                    .footer {{
+                    }
+                    .footer {
                         text-align: center;
                         margin-top: 30px;
                         color: #666;
-                    }}
+                    }
                 </style>
             </head>
             <body>
@@ -75,7 +58,7 @@ def send_correction_email(to_email="celine.camenzind@bluewin.ch", first_name="Ce
                         <h1>🏔️ Rigibeats 2026 🎵</h1>
                     </div>
                     <div class="content">
-                        <p>{greeting}</p>
+                        <p>${greeting}</p>
                         
                         <p>Wir haben gesehen, dass du sowohl Goldau- als auch Gersau-Tickets gekauft hast. Hier noch eine wichtige Info für deine Goldau-Tickets:</p>
                         
@@ -99,29 +82,17 @@ def send_correction_email(to_email="celine.camenzind@bluewin.ch", first_name="Ce
         </html>
         """
 
-        msg = MIMEMultipart('alternative')
-        msg["From"] = EMAIL_ADDRESS
-        msg["To"] = to_email
-        msg["Bcc"] = "hi@rigibeats.ch"
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, 'html', 'utf-8'))
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-            logging.info(f"✅ Correction email sent to {to_email}")
-            return True
-            
-    except Exception as e:
-        logging.error(f"❌ Failed to send correction email to {to_email}: {e}")
-        return False
+CAMPAIGN = Campaign(
+    name="eventinfo-correction",
+    source=StaticSource([Recipient("celine.camenzind@bluewin.ch", {"first_name": "Celine"})]),
+    template=CompiledTemplate(CORRECTION_HTML, settings.EMAIL_ADDRESS, EMAIL_SUBJECT, bcc=settings.BCC_ADDRESS),
+    fields=lambda data: {"greeting": f"Hey {data['first_name']}!" if data.get("first_name") else "Hey!"},
+    test_recipients=[Recipient("maximilian.weber@bluewin.ch", {"first_name": "Max"})],
+)
 
 
 def main():
     """Main function."""
-    import argparse
-    
     parser = argparse.ArgumentParser(description='Send correction email for Goldau ticket info')
     parser.add_argument('--demo', action='store_true', help='Send demo to maximilian.weber@bluewin.ch')
     args = parser.parse_args()
@@ -129,7 +100,7 @@ def main():
     if args.demo:
         logging.info("🧪 DEMO MODE - Sending to maximilian.weber@bluewin.ch")
         logging.info("="*60)
-        success = send_correction_email(to_email="maximilian.weber@bluewin.ch", first_name="Max")
+        stats = run_campaign(CAMPAIGN, MODE_DRY_RUN)
     else:
         logging.info("📧 Sending correction email to Celine Camenzind...")
         logging.info("="*60)
@@ -140,19 +111,22 @@ def main():
         print("   Name: Celine")
         print("   Content: Goldau railway ticket information")
         print()
-        confirm = input("Continue? (yes/no): ")
-        
-        if confirm.lower() != 'yes':
+        if not confirm("Continue? (yes/no): "):
             logging.info("Cancelled by user")
             return
         
         # Send email
-        success = send_correction_email()
+        stats = run_campaign(CAMPAIGN, MODE_PRODUCTION, workers=1)
     
-    if success:
+    if stats.sent and not stats.failed:
         logging.info("\n" + "="*60)
         logging.info("✅ Correction email sent successfully!")
         logging.info("="*60)
+    elif stats.skipped or stats.suppressed:
+        reason = "already received it" if stats.skipped else "is on the suppression list"
+        logging.info("\n" + "="*60)
+        logging.info(f"⏭️  Correction email not sent: celine.camenzind@bluewin.ch {reason}")
+        logging.info("="*60)
     else:
         logging.error("\n" + "="*60)
         logging.error("❌ Failed to send correction email")
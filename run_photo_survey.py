@@ -4,315 +4,168 @@ Sends HTML formatted email with Google Forms link and event photo
 Asks attendees to share feedback about what went well and what could be improved
 """
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
-from dotenv import load_dotenv
-from tqdm import tqdm
-import logging
-import pandas as pd
 import argparse
-from datetime import datetime
-
-load_dotenv()
-
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-# SMTP Configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = 587
-EMAIL_ADDRESS = os.getenv("SMTP_ACCOUNT")
-EMAIL_PASSWORD = os.getenv("SMTP_PASSWORD")
+import logging
+import os
+from campaign import settings
+from campaign.assets import InlineImage
+from campaign.cli import COMMAND_REPORT, add_csv_campaign_arguments, confirm, start_metrics_export
+from campaign.journal import journal_path_for
+from campaign.pipeline import MODE_DRY_RUN, MODE_PRODUCTION, MODE_SIMULATE, Campaign, Recipient, run_campaign
+from campaign.report import campaign_report
+from campaign.sources import CsvSource, StreamingCsvSource
+from campaign.templates import CompiledTemplate
 
 # File paths
 CSV_FILE = "data/24 Jan 2026 1300 - Rigibeats 2026 - Orders.csv"
 IMAGE_FILE = "data/_DSC0127.jpg"
 OUTPUT_FILE = "data/24 Jan 2026 1300 - Rigibeats 2026 - Orders_feedback_survey_sent.csv"
+SENT_COLUMN = "Feedback Survey Sent"
+
+# Email content
+EMAIL_SUBJECT = "Rigibeats 2026 - Dein Feedback 💭"
 
 # Google Forms link
 FORMS_LINK = "https://docs.google.com/forms/d/e/1FAIpQLSdG-ARZABazBueDmIJZT42bK08MMznhuRXs93bT-r2hoLf8KA/viewform?usp=dialog"
 
+FEEDBACK_SURVEY_HTML = """
+    <html>
+        <head>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                }
+                .container {
+                    max-width: 600px;
+                    margin: 0 auto;
+                    padding: 20px;
+                }
+                .header {
+                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                    color: white;
+                    padding: 30px;
+                    border-radius: 10px 10px 0 0;
+                    text-align: center;
+                }
+                .content {
+                    background-color: #ffffff;
+                    padding: 30px;
+                    border-radius: 0 0 10px 10px;
+                }
+                .cta-button {
+                    display: inline-block;
+                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                    color: white;
+                    padding: 15px 30px;
+                    text-decoration: none;
+                    border-radius: 5px;
+                    font-weight: bold;
+                    margin: 20px 0;
+                }
+                .footer {
+                    text-align: center;
+                    margin-top: 30px;
+                    color: #666;
+                }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>💭 Dein Feedback zählt! 💭</h1>
+                </div>
+                <div class="content">
+                    <p>${greeting}</p>
+                    
+                    <p>Was für ein unvergesslicher Tag auf der Rigi! 🏔️🎉</p>
+                    ${photo}
+                    
+                    <p><strong>Wie hat dir das Event gefallen?</strong></p>
+                    
+                    <p>Deine Meinung ist uns wichtig! Wir möchten von dir erfahren, was dir besonders 
+                    gut gefallen hat und wo wir uns noch verbessern können. Dein ehrliches Feedback 
+                    hilft uns, die nächsten Events noch besser zu machen.</p>
+                    
+                    <p>Das Ausfüllen dauert nur wenige Minuten und ist für uns unglaublich wertvoll! 🙏</p>
+                    
+                    <p style="text-align: center;">
+                        <a href="${forms_link}" class="cta-button">
+                            📝 Jetzt Feedback geben
+                        </a>
+                    </p>
+                    
+                    <p>Vielen Dank, dass du dabei warst und diese Nacht so besonders gemacht hast! ❤️</p>
+                    
+                    <div class="footer">
+                        <p>See you next time! 🎵<br>
+                        <strong>Rigibeats Team</strong></p>
+                    </div>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+# Event photo block, only used with --photo
+PHOTO_CID = "event-photo@rigibeats.ch"
+PHOTO_HTML = f"""
+                    <p style="text-align: center;">
+                        <img src="cid:{PHOTO_CID}" alt="Rigibeats 2026" style="max-width: 100%; border-radius: 10px;">
+                    </p>
+"""
+
 
-def is_valid_email(email):
-    """Basic email validation."""
-    if not email or pd.isna(email):
-        return False
-    email_str = str(email).strip()
-    return "@" in email_str and "." in email_str and len(email_str) > 5
+def compile_feedback_survey(photo=None):
+    """Compile the feedback survey email, optionally with an inline event photo."""
+    return CompiledTemplate(
+        FEEDBACK_SURVEY_HTML, settings.EMAIL_ADDRESS, EMAIL_SUBJECT, bcc=settings.BCC_ADDRESS,
+        constants={"forms_link": FORMS_LINK, "photo": PHOTO_HTML if photo else ""},
+        inline_images=[InlineImage(photo, cid=PHOTO_CID)] if photo else ()
+    )
 
 
-def send_feedback_survey_email(to_email, first_name="", test_mode=False):
-    """Send feedback survey email with HTML formatting."""
-    try:
-        # Personalized greeting
-        greeting = f"Hey {first_name}!" if first_name else "Hey!"
-        
-        subject = "Rigibeats 2026 - Dein Feedback 💭"
-        
-        # HTML email body with embedded image
-        body = f"""
-        <html>
-            <head>
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        line-height: 1.6;
-                        color: #333;
-                    }}
-                    .container {{
-                        max-width: 600px;
-                        margin: 0 auto;
-                        padding: 20px;
-                    }}
-                    .header {{
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        padding: 30px;
-                        border-radius: 10px 10px 0 0;
-                        text-align: center;
-                    }}
-                    .content {{
-                        background-color: #ffffff;
-                        padding: 30px;
-                        border-radius: 0 0 10px 10px;
-                    }}
-                    .cta-button {{
-                        display: inline-block;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        padding: 15px 30px;
-                        text-decoration: none;
-                        border-radius: 5px;
-                        font-weight: bold;
-                        margin: 20px 0;
-                    }}
-                    .footer {{
-                        text-align: center;
-                        margin-top: 30px;
-                        color: #666;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>💭 Dein Feedback zählt! 💭</h1>
-                    </div>
-                    <div class="content">
-                        <p>{greeting}</p>
-                        
-                        <p>Was für ein unvergesslicher Tag auf der Rigi! 🏔️🎉</p>
-                        
-                        <p><strong>Wie hat dir das Event gefallen?</strong></p>
-                        
-                        <p>Deine Meinung ist uns wichtig! Wir möchten von dir erfahren, was dir besonders 
-                        gut gefallen hat und wo wir uns noch verbessern können. Dein ehrliches Feedback 
-                        hilft uns, die nächsten Events noch besser zu machen.</p>
-                        
-                        <p>Das Ausfüllen dauert nur wenige Minuten und ist für uns unglaublich wertvoll! 🙏</p>
-                        
-                        <p style="text-align: center;">
-                            <a href="{FORMS_LINK}" class="cta-button">
-                                📝 Jetzt Feedback geben
-                            </a>
-                        </p>
-                        
-                        <p>Vielen Dank, dass du dabei warst und diese Nacht so besonders gemacht hast! ❤️</p>
-                        
-                        <div class="footer">
-                            <p>See you next time! 🎵<br>
-                            <strong>Rigibeats Team</strong></p>
-                        </div>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
+def feedback_survey_fields(data):
+    """Template fields for one recipient."""
+    first_name = data.get("first_name", "")
+    return {"greeting": f"Hey {first_name}!" if first_name else "Hey!"}
 
-        if test_mode:
-            logging.info(f"✉️  Test Email Preview:")
-            logging.info(f"To: {to_email}")
-            logging.info(f"Name: {first_name}")
-            logging.info(f"Subject: {subject}")
-            logging.info(f"Forms Link: {FORMS_LINK}")
-            logging.info(f"{'─'*60}")
-            return True
 
-        msg = MIMEMultipart('alternative')
-        msg["From"] = EMAIL_ADDRESS
-        msg["To"] = to_email
-        msg["Bcc"] = "hi@rigibeats.ch"
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, 'html', 'utf-8'))
+def describe(recipient):
+    """Preview lines for one recipient."""
+    return [
+        f"To: {recipient.email}",
+        f"Name: {recipient.data.get('first_name', '')}",
+        f"Subject: {EMAIL_SUBJECT}",
+        f"Forms Link: {FORMS_LINK}",
+    ]
 
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-            logging.info(f"✅ Email sent to {to_email}")
-            return True
-            
-    except Exception as e:
-        logging.error(f"❌ Failed to send email to {to_email}: {e}")
-        return False
 
+CAMPAIGN = Campaign(
+    name="feedback-survey",
+    source=CsvSource(CSV_FILE, SENT_COLUMN),
+    template=compile_feedback_survey(),
+    fields=feedback_survey_fields,
+    describe=describe,
+    journal_path=journal_path_for(OUTPUT_FILE),
+    test_recipients=[Recipient("maximilian.weber@bluewin.ch", {"first_name": "Max"})],
+)
 
-def process_csv_and_send_emails(dry_run=False, test_email=None, simulate=False):
-    """Process CSV file and send feedback survey emails."""
-    try:
-        # Read CSV
-        df = pd.read_csv(CSV_FILE, encoding='utf-8-sig')
-        logging.info(f"Loaded {len(df)} records from CSV")
-        
-        # Add 'Feedback Survey Sent' column if it doesn't exist
-        if 'Feedback Survey Sent' not in df.columns:
-            df['Feedback Survey Sent'] = ''
-            logging.info("Added 'Feedback Survey Sent' column")
-        
-        # If dry run with test email, send only to test email
-        if dry_run and test_email:
-            logging.info(f"\n{'='*60}")
-            logging.info("🧪 DRY RUN MODE - Sending test email")
-            logging.info(f"{'='*60}\n")
-            
-            success = send_feedback_survey_email(
-                to_email=test_email,
-                first_name="Max",
-                test_mode=False
-            )
-            
-            if success:
-                logging.info(f"\n✅ Test email sent successfully to {test_email}!")
-                logging.info("\nPlease check the inbox to verify the format!")
-            else:
-                logging.error(f"\n❌ Failed to send test email")
-            
-            return
-        
-        # If simulate mode, show what would happen
-        if simulate:
-            logging.info(f"\n{'='*60}")
-            logging.info(f"🔍 SIMULATION MODE - Preview")
-            logging.info(f"{'='*60}\n")
-            
-            # Track unique emails
-            email_tracker = {}
-            total_entries = 0
-            already_sent = 0
-            
-            for idx, row in df.iterrows():
-                email = row.get('Email', '')
-                first_name = row.get('First name', '')
-                
-                if not is_valid_email(email):
-                    continue
-                
-                if row.get('Feedback Survey Sent', ''):
-                    already_sent += 1
-                    continue  # Skip already sent
-                
-                total_entries += 1
-                
-                if email in email_tracker:
-                    email_tracker[email] += 1
-                else:
-                    email_tracker[email] = 1
-            
-            # Count duplicates
-            duplicate_count = sum(count - 1 for count in email_tracker.values() if count > 1)
-            
-            logging.info(f"📊 Simulation Summary:")
-            logging.info(f"   Total entries with valid emails: {total_entries}")
-            logging.info(f"   Unique email addresses: {len(email_tracker)}")
-            logging.info(f"   Duplicate entries: {duplicate_count}")
-            logging.info(f"   Already sent: {already_sent}")
-            logging.info(f"\n   ✅ DEDUPLICATION: Each email will receive ONLY ONE email!")
-            logging.info(f"   📧 Total emails that will be sent: {len(email_tracker)}")
-            logging.info(f"\n   Forms link: {FORMS_LINK}")
-            logging.info(f"{'='*60}\n")
-            
-            return
-        
-        # Production mode - process all records
-        logging.info(f"\n{'='*60}")
-        logging.info("🚀 PRODUCTION MODE - Sending emails to all recipients")
-        logging.info(f"{'='*60}\n")
-        
-        # Group by email to avoid duplicates
-        logging.info("📋 Analyzing emails and grouping duplicates...")
-        email_groups = {}
-        total_rows = 0
-        already_sent_count = 0
-        
-        for idx, row in df.iterrows():
-            email = row.get('Email', '')
-            if not is_valid_email(email):
-                continue
-            if row.get('Feedback Survey Sent', ''):
-                already_sent_count += 1
-                continue  # Skip already sent
-            
-            total_rows += 1
-            
-            if email not in email_groups:
-                email_groups[email] = {
-                    'indices': [idx],
-                    'first_name': row.get('First name', '')
-                }
-            else:
-                email_groups[email]['indices'].append(idx)
-        
-        # Calculate duplicates
-        duplicate_entries = total_rows - len(email_groups)
-        
-        logging.info(f"\n📊 Email Analysis:")
-        logging.info(f"   Total entries with valid emails: {total_rows}")
-        logging.info(f"   Unique email addresses: {len(email_groups)}")
-        logging.info(f"   Duplicate entries (will be skipped): {duplicate_entries}")
-        logging.info(f"   Already sent (will be skipped): {already_sent_count}")
-        logging.info(f"   ✅ Each person will receive ONLY ONE email!\n")
-        
-        sent_count = 0
-        skipped_count = 0
-        
-        # Send emails
-        for email, info in tqdm(email_groups.items(), desc="Sending emails"):
-            first_name = info['first_name']
-            indices = info['indices']
-            
-            if send_feedback_survey_email(email, first_name, test_mode=False):
-                # Mark ALL rows with this email as sent
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                for idx in indices:
-                    df.at[idx, 'Feedback Survey Sent'] = timestamp
-                sent_count += 1
-            else:
-                skipped_count += 1
-        
-        # Save updated CSV with timestamp
-        timestamp = datetime.now().strftime('%Y-%m-%d_%H%M')
-        output_file_timestamped = OUTPUT_FILE.replace('.csv', f'_{timestamp}.csv')
-        df.to_csv(output_file_timestamped, index=False, encoding='utf-8-sig')
-        
-        # Also save as Excel
-        output_excel = output_file_timestamped.replace('.csv', '.xlsx')
-        df.to_excel(output_excel, index=False, engine='openpyxl')
-        
-        logging.info(f"\n{'='*60}")
-        logging.info("📊 Summary:")
-        logging.info(f"✅ Emails sent: {sent_count}")
-        logging.info(f"❌ Skipped/Failed: {skipped_count}")
-        logging.info(f"💾 Output saved to:")
-        logging.info(f"   - CSV: {output_file_timestamped}")
-        logging.info(f"   - Excel: {output_excel}")
-        logging.info(f"{'='*60}\n")
-        
-    except Exception as e:
-        logging.error(f"Error processing CSV: {e}")
-        raise
+
+def use_photo(path):
+    """Embed the photo at path inline in every feedback survey email of this run."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Photo not found: {path}")
+    CAMPAIGN.template = compile_feedback_survey(path)
+    logging.info(f"🖼️  Embedding photo {path} inline")
+
+
+def use_streaming_source():
+    """Read the Orders CSV in chunks instead of loading it at once."""
+    # Everyone gets the same survey, so no address has to wait for its Goldau status
+    CAMPAIGN.source = StreamingCsvSource(CSV_FILE, SENT_COLUMN, goldau_priority=False)
+    logging.info("🌊 Streaming the Orders CSV in chunks")
 
 
 def main():
@@ -330,6 +183,12 @@ Examples:
   
   # Production - Send to all recipients:
   python run_photo_survey.py
+
+  # Afterwards - Tracking CSV/Excel copy from the delivery journal:
+  python run_photo_survey.py report
+
+  # Include the event photo inline:
+  python run_photo_survey.py --photo
         """
     )
     parser.add_argument(
@@ -342,24 +201,41 @@ Examples:
         action='store_true',
         help='Simulate mode: analyze CSV without sending emails'
     )
+    add_csv_campaign_arguments(parser)
+    parser.add_argument(
+        '--photo',
+        nargs='?',
+        const=IMAGE_FILE,
+        metavar='PATH',
+        help=f'Embed a photo inline in the email (default path: {IMAGE_FILE})'
+    )
     args = parser.parse_args()
+    start_metrics_export(args)
+    
+    if args.stream:
+        use_streaming_source()
+    
+    if args.photo:
+        use_photo(args.photo)
     
-    if args.simulate:
+    if args.command == COMMAND_REPORT:
+        logging.info("📄 Writing the tracking report")
+        campaign_report(CAMPAIGN, OUTPUT_FILE, excel=not args.no_excel)
+    elif args.simulate:
         logging.info("🔍 Starting in SIMULATION mode")
-        process_csv_and_send_emails(simulate=True)
+        run_campaign(CAMPAIGN, MODE_SIMULATE)
     elif args.dry_run:
         logging.info("🧪 Starting in DRY RUN mode")
-        process_csv_and_send_emails(
-            dry_run=True, 
-            test_email="maximilian.weber@bluewin.ch"
-        )
+        run_campaign(CAMPAIGN, MODE_DRY_RUN, attachments_dir=args.attachments)
     else:
         logging.info("🚀 Starting in PRODUCTION mode")
-        confirm = input("⚠️  This will send emails to ALL recipients. Continue? (yes/no): ")
-        if confirm.lower() != 'yes':
+        if not confirm():
             logging.info("Cancelled by user")
             return
-        process_csv_and_send_emails(dry_run=False)
+        run_campaign(
+            CAMPAIGN, MODE_PRODUCTION, workers=args.workers, backend=args.backend,
+            attachments_dir=args.attachments
+        )
     
     logging.info("Script finished.")
 
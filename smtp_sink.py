@@ -0,0 +1,101 @@
+"""
+Run a local SMTP sink to measure delivery throughput
+Accepts and discards everything the campaign scripts send. Point a script
+at it with the environment printed at start-up; the message rate is
+logged while it runs and summarised (optionally as JSON) on Ctrl-C.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from campaign.smtp_sink import DEFAULT_HOST, DEFAULT_PORT, SMTPSink, parse_failures, parse_latency
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+STATS_INTERVAL = 10
+
+
+async def report_progress(sink, interval=STATS_INTERVAL):
+    """Log the counters every interval seconds while messages are coming in."""
+    last = 0
+    while True:
+        await asyncio.sleep(interval)
+        stats = sink.stats
+        if stats.messages != last:
+            logging.info(f"📨 {stats.messages} messages ({(stats.messages - last) / interval:.1f}/s), "
+                         f"{stats.sessions} sessions, rejected {dict(stats.rejected) or 0}")
+            last = stats.messages
+
+
+async def serve(sink):
+    await sink.start()
+    env = " ".join(f"{name}={value}" for name, value in sink.client_environment().items())
+    logging.info(f"📭 SMTP sink listening on {sink.host}:{sink.port}")
+    logging.info(f"Point the scripts at it with: {env} uv run python run.py ...")
+    progress = asyncio.create_task(report_progress(sink))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        progress.cancel()
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description='Local SMTP sink for throughput tests (accepts and discards all mail)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Sink with STARTTLS and a self-signed certificate on port 8025:
+  uv run python smtp_sink.py
+
+  # In another shell, send a campaign to it:
+  SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_CA_FILE=.cache/smtp_sink/cert.pem uv run python run_eventinfo.py
+
+  # Behave like a slow provider that bounces 1% of recipients and throttles 2% of messages:
+  uv run python smtp_sink.py --latency 0.02 --latency DATA=0.3 --fail RCPT=0.01:550 --fail DATA=0.02:451
+
+  # Plain SMTP (clients need SMTP_STARTTLS=0), stats written as JSON on exit:
+  uv run python smtp_sink.py --no-starttls --stats-file sink.json
+        """
+    )
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-starttls', action='store_true', help='Do not offer STARTTLS')
+    parser.add_argument('--cert', help='PEM certificate to use instead of the generated one')
+    parser.add_argument('--key', help='PEM private key for --cert')
+    parser.add_argument(
+        '--latency', action='append', metavar='[COMMAND=]SECONDS',
+        help='Delay before replying (to every command, or to CONNECT/EHLO/STARTTLS/AUTH/MAIL/RCPT/DATA/QUIT); repeatable'
+    )
+    parser.add_argument(
+        '--fail', action='append', metavar='COMMAND=RATE[:CODE]',
+        help='Answer this share of a command with CODE (default 451), e.g. RCPT=0.01:550; repeatable'
+    )
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible failure injection')
+    parser.add_argument('--stats-file', help='Write the final counters to this JSON file')
+    args = parser.parse_args()
+
+    sink = SMTPSink(
+        args.host, args.port, starttls=not args.no_starttls, cert=args.cert, key=args.key,
+        latency=parse_latency(args.latency), failures=parse_failures(args.fail), seed=args.seed
+    )
+    try:
+        asyncio.run(serve(sink))
+    except KeyboardInterrupt:
+        pass
+    stats = sink.stats.snapshot()
+    logging.info(f"📊 {stats['messages']} messages to {stats['recipients']} recipients "
+                 f"in {stats['sessions']} sessions, {stats['messages_per_second'] or 0} messages/s")
+    if args.stats_file:
+        with open(args.stats_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+        logging.info(f"💾 Stats saved to {args.stats_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Manage the global suppression list
+Addresses on the list are skipped by every campaign. Hard bounces are
+added automatically while sending; unsubscribes and complaints are added
+here.
+"""
+
+import argparse
+import logging
+from campaign.suppression import REASON_MANUAL, REASON_UNSUBSCRIBE, get_suppression_list
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description='Manage the suppression list consulted before every send',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Someone asked not to get any more emails:
+  python suppress.py add foo@bluewin.ch --reason unsubscribe
+
+  # Show all suppressed addresses:
+  python suppress.py list
+
+  # Mail an address again:
+  python suppress.py remove foo@bluewin.ch
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add = subparsers.add_parser('add', help='Suppress one or more addresses')
+    add.add_argument('emails', nargs='+', metavar='EMAIL')
+    add.add_argument('--reason', choices=[REASON_UNSUBSCRIBE, REASON_MANUAL], default=REASON_MANUAL)
+    add.add_argument('--note', default='', help='Free-text detail stored with the entry')
+    remove = subparsers.add_parser('remove', help='Lift the suppression of one or more addresses')
+    remove.add_argument('emails', nargs='+', metavar='EMAIL')
+    subparsers.add_parser('list', help='Show all suppressed addresses')
+    args = parser.parse_args()
+
+    suppressions = get_suppression_list()
+    if args.command == 'add':
+        for email in args.emails:
+            suppressions.add(email, args.reason, args.note)
+            logging.info(f"🚫 {email} suppressed ({args.reason})")
+    elif args.command == 'remove':
+        for email in args.emails:
+            if suppressions.remove(email):
+                logging.info(f"✅ {email} removed from the suppression list")
+            else:
+                logging.warning(f"{email} was not suppressed")
+    else:
+        entries = suppressions.entries()
+        for email, reason, detail, created_at in entries:
+            print(f"{created_at}  {reason:<12} {email}  {detail}")
+        logging.info(f"{len(entries)} suppressed address(es) in {suppressions.path}")
+
+
+if __name__ == "__main__":
+    main()